@@ -21,12 +21,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-z&m#p*qz8gt^aw@2k$d^tt+gceuz*$@67#kt48*uzftw2%9=4='
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    'django-insecure-z&m#p*qz8gt^aw@2k$d^tt+gceuz*$@67#kt48*uzftw2%9=4=',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Besides tracebacks, DEBUG keeps every query's SQL in memory.
+DEBUG = bool(int(os.environ.get('DEBUG', 0)))
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
 
 
 # Application definition
@@ -38,6 +46,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -47,6 +56,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,16 +91,115 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_CONN_MAX_AGE keeps a connection open per thread for that many
+# seconds. DB_POOL=1 instead checks connections out of an in-process pool
+# per request, core.backends.postgresql_pool, with health checks on the
+# ones that sat idle.
+
+_DB_POOL = bool(int(os.environ.get('DB_POOL', 0)))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.backends.postgresql_pool' if _DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DB_CONN_MAX_AGE',
+            0 if _DB_POOL else 60,
+        )),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'HEALTH_CHECK_SECONDS': float(
+                os.environ.get('DB_POOL_HEALTH_CHECK_SECONDS', 30)
+            ),
+        },
     }
 }
 
+# Read replicas, one alias per host in DB_REPLICA_HOSTS. core.routers
+# sends the reads of safe recipe API requests to them, and keeps a user
+# on the primary for PIN_SECONDS after a write so they see it. The pins
+# are kept in CACHE_ALIAS, which has to be shared (REDIS_URL) outside
+# DEBUG, see core.checks.
+_DB_REPLICA_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+    if host.strip()
+]
+for _index, _host in enumerate(_DB_REPLICA_HOSTS, start=1):
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        # A second connection to the test database, outside the test
+        # case transaction, so reads routed to it miss uncommitted rows.
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+DATABASE_REPLICATION = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'PIN_SECONDS': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10)),
+    'CACHE_ALIAS': os.environ.get('DB_REPLICA_PIN_CACHE_ALIAS', 'default'),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# REDIS_URL (or CACHE_URL) shares the cache between the workers, which
+# the response cache needs outside DEBUG, see core.checks. Without it
+# each process has its own locmem cache. CACHE_BACKEND and
+# CACHE_LOCATION pick any other backend.
+
+_CACHE_URL = os.environ.get('REDIS_URL') or os.environ.get('CACHE_URL', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django_redis.cache.RedisCache' if _CACHE_URL
+            else 'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', _CACHE_URL),
+    }
+}
+
+RECIPE_CACHE_ALIAS = os.environ.get('RECIPE_CACHE_ALIAS', 'default')
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the preferred hasher (pbkdf2, argon2 or bcrypt),
+# the others stay listed so existing hashes verify and get upgraded on
+# the next login.
+
+_PASSWORD_HASHERS = {
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+_PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[_PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items()
+    if name != _PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_HASHING = {
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 102400)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 8)),
+    'BCRYPT_ROUNDS': int(os.environ.get('BCRYPT_ROUNDS', 12)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -133,17 +243,101 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Limits checked by recipe.uploadhandlers while an image streams in.
+IMAGE_UPLOAD = {
+    'MAX_BYTES': int(os.environ.get('IMAGE_UPLOAD_MAX_BYTES', 10 * 2 ** 20)),
+    'MAX_DIMENSION': int(os.environ.get('IMAGE_UPLOAD_MAX_DIMENSION', 8000)),
+    'MAX_PIXELS': int(os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)),
+    # How much of the file may be buffered to find the image header.
+    'SNIFF_BYTES': 256 * 2 ** 10,
+    'FORMATS': ['JPEG', 'PNG', 'WEBP'],
+}
+
+# Resized copies of uploaded recipe images are written by a background
+# thread pool after the upload commits. EAGER runs the job inline in the
+# on_commit hook instead, which the tests rely on.
+IMAGE_PROCESSING = {
+    'EAGER': bool(int(os.environ.get('IMAGE_PROCESSING_EAGER', 0))),
+    'WORKERS': int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2)),
+    'QUALITY': int(os.environ.get('IMAGE_PROCESSING_QUALITY', 80)),
+    # process_pending_images redoes the jobs pending for this long.
+    'STALE_SECONDS': int(os.environ.get('IMAGE_PROCESSING_STALE', 600)),
+    # Variant label -> longest side in pixels.
+    'VARIANTS': {
+        'thumbnail': 200,
+        'medium': 800,
+    },
+}
+
+# Async list/retrieve views (recipe.async_views) run the blocking part of
+# a request in a pool of WORKERS threads, which also caps the database
+# connections they use. Keep it within the connection pool size.
+ASYNC_VIEWS = {
+    'WORKERS': int(os.environ.get('ASYNC_VIEWS_WORKERS', 8)),
+}
+
+# core.middleware.InstrumentationMiddleware times a SAMPLE_RATE share
+# of requests per view. SERVER_TIMING sends the timings back to the
+# client. /metrics serves the totals, and the COLLECTORS counters, to
+# METRICS_IPS only.
+INSTRUMENTATION = {
+    'SAMPLE_RATE': float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 0.1)),
+    'SERVER_TIMING': bool(int(os.environ.get('SERVER_TIMING', DEBUG))),
+    'METRICS_IPS': os.environ.get('METRICS_IPS', '127.0.0.1,::1').split(','),
+    'COLLECTORS': {
+        'recipe_cache': 'recipe.cache.get_metrics',
+    },
+}
+
+# core.middleware.QueryBudgetMiddleware records the queries of each
+# request when ENABLED, logs the shapes run REPEAT_THRESHOLD times and
+# checks the max_queries/constant_queries budget of the view, raising
+# when RAISE (the test runner sets it). Queries over SLOW_QUERY_MS are
+# logged, with their plan when EXPLAIN, 0 turns that off.
+QUERY_BUDGET = {
+    'ENABLED': bool(int(os.environ.get('QUERY_BUDGET', DEBUG))),
+    'RAISE': bool(int(os.environ.get('QUERY_BUDGET_RAISE', 0))),
+    'REPEAT_THRESHOLD': int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5)),
+    'SLOW_QUERY_MS': int(os.environ.get('SLOW_QUERY_MS', 500)),
+    'EXPLAIN': bool(int(os.environ.get('SLOW_QUERY_EXPLAIN', DEBUG))),
+}
+
+TEST_RUNNER = 'core.test_runner.QueryBudgetTestRunner'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
+# No DEFAULT_SCHEMA_CLASS: the routers read every viewset's `schema`
+# while the URLs load, which would import drf_spectacular in each worker.
+# core.schema switches to drf_spectacular's AutoSchema to generate.
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'core.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_IP_THROTTLE_RATE', '30/min'),
+        'login_email': os.environ.get('LOGIN_EMAIL_THROTTLE_RATE', '10/min'),
+    },
+}
+
+# Token -> user snapshots kept in process for LOCAL_TTL seconds, and in
+# the ALIAS cache (if set) for SHARED_TTL seconds.
+TOKEN_AUTH_CACHE = {
+    'ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS') or None,
+    'MAXSIZE': int(os.environ.get('TOKEN_AUTH_CACHE_MAXSIZE', 10000)),
+    'LOCAL_TTL': int(os.environ.get('TOKEN_AUTH_CACHE_LOCAL_TTL', 30)),
+    'SHARED_TTL': int(os.environ.get('TOKEN_AUTH_CACHE_SHARED_TTL', 300)),
+}
+
+# The OpenAPI schema is generated once per VERSION, by generate_schema
+# or on the first request, and kept in DIR and in memory. Without a
+# VERSION (a release or commit id) a digest of the source is used.
+SCHEMA_CACHE = {
+    'VERSION': os.environ.get('APP_VERSION', ''),
+    'DIR': os.environ.get('SCHEMA_CACHE_DIR', '/vol/web/schema'),
 }
 
 SPECTACULAR_SETTINGS ={
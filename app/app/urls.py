@@ -17,19 +17,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView
-)
+
+from core import instrumentation, schema
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
-    path(
-        'api/docs/',
-        SpectacularSwaggerView.as_view(url_name='api-schema'),
-        name='api-docs',
-    ),
+    path('metrics', instrumentation.metrics_view, name='metrics'),
+    path('api/schema/', schema.schema_view, name='api-schema'),
+    path('api/docs/', schema.docs_view, name='api-docs'),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls'))
     
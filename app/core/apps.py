@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from core import checks, signals  # noqa: F401
+        from core import instrumentation, querybudget
+
+        connection_created.connect(instrumentation.install_query_recorder)
+        connection_created.connect(querybudget.install_query_recorder)
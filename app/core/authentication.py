@@ -0,0 +1,232 @@
+"""
+Token authentication backed by an in-process LRU and a shared cache
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+from core.concurrency import run_sync
+
+SHARED_KEY = 'auth:token:{key}'
+USER_TOKEN_KEY = 'auth:user-token:{user_id}'
+
+
+class TTLCache:
+    """Thread safe LRU mapping whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+    global _local_cache
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                _local_cache = TTLCache(
+                    maxsize=settings.TOKEN_AUTH_CACHE['MAXSIZE'],
+                    ttl=settings.TOKEN_AUTH_CACHE['LOCAL_TTL'],
+                )
+    return _local_cache
+
+
+def _shared_cache():
+    alias = settings.TOKEN_AUTH_CACHE['ALIAS']
+    return caches[alias] if alias else None
+
+
+def get_cached_token(key):
+    token = get_local_cache().get(key)
+    if token is None:
+        shared = _shared_cache()
+        if shared is not None:
+            token = shared.get(SHARED_KEY.format(key=key))
+            if token is not None:
+                get_local_cache().set(key, token)
+    return token
+
+
+def cache_token(token):
+    get_local_cache().set(token.key, token)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(
+            SHARED_KEY.format(key=token.key),
+            token,
+            timeout=settings.TOKEN_AUTH_CACHE['SHARED_TTL'],
+        )
+
+
+def evict_tokens(*keys):
+    for key in keys:
+        get_local_cache().delete(key)
+    shared = _shared_cache()
+    if shared is not None and keys:
+        shared.delete_many([SHARED_KEY.format(key=key) for key in keys])
+
+
+def get_or_create_token_key(user):
+    """Return the user's token key, only hitting the database on a miss."""
+    cache_key = USER_TOKEN_KEY.format(user_id=user.pk)
+    key = caches['default'].get(cache_key)
+    if key is None:
+        token, created = Token.objects.get_or_create(user=user)
+        key = token.key
+        caches['default'].set(
+            cache_key,
+            key,
+            timeout=settings.TOKEN_AUTH_CACHE['SHARED_TTL'],
+        )
+    return key
+
+
+def forget_token_key(user_id):
+    caches['default'].delete(USER_TOKEN_KEY.format(user_id=user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token/user query on cache hits.
+
+    Entries are evicted when the token is deleted or the user is saved.
+    Other processes only see that through the shared cache, so their
+    in-process copies are bounded by the short local TTL.
+    """
+
+    def get_key(self, request):
+        """The token key of the Authorization header, if it has one."""
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise exceptions.AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _(
+                'Invalid token header. '
+                'Token string should not contain spaces.'
+            )
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            msg = _(
+                'Invalid token header. '
+                'Token string should not contain invalid characters.'
+            )
+            raise exceptions.AuthenticationFailed(msg)
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    async def authenticate_async(self, request):
+        """`authenticate` for async views.
+
+        A hit in the in-process cache is answered on the event loop, the
+        shared cache and the database are read in the async view pool.
+        """
+        key = self.get_key(request)
+        if key is None:
+            return None
+        token = get_local_cache().get(key)
+        if token is not None:
+            return self._snapshot(token)
+        return await run_sync(self.authenticate_credentials, key)
+
+    def authenticate_credentials(self, key):
+        token = get_cached_token(key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').defer(
+                    'user__password',
+                ).get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(
+                    _('User inactive or deleted.')
+                )
+            cache_token(token)
+        return self._snapshot(token)
+
+    def _snapshot(self, token):
+        # Hand out copies so request code can't mutate the cached snapshot.
+        user = copy.copy(token.user)
+        token = copy.copy(token)
+        token.user = user
+        return (user, token)
+
+
+class PreAuthentication(BaseAuthentication):
+    """Credentials an async view checked before calling a DRF view.
+
+    The view stores the result of `authenticate_async`, or the error it
+    raised, as `async_auth` on the Django request.
+    """
+    keyword = TokenAuthentication.keyword
+
+    def authenticate(self, request):
+        result = getattr(request._request, 'async_auth', None)
+        if isinstance(result, exceptions.APIException):
+            raise result
+        return result
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,110 @@
+"""
+PostgreSQL backend taking its connections from an in-process pool
+
+Set `POOL` in the database settings to size it:
+
+    'POOL': {
+        'MAX_SIZE': 10,
+        'MIN_SIZE': 2,
+        'TIMEOUT': 10,
+        'HEALTH_CHECK_SECONDS': 30,
+    }
+
+Closing a connection, at the end of every request with CONN_MAX_AGE 0,
+returns it to the pool instead of closing the socket.
+"""
+
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base, creation
+
+from core.backends.postgresql_pool.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connect(conn_params):
+    connection = base.Database.connect(**conn_params)
+    # As the stock backend, JSONField decodes the raw string itself.
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection,
+        loads=lambda x: x,
+    )
+    return connection
+
+
+def get_pool(alias, conn_params, options):
+    """The process wide pool of the alias and connection parameters.
+
+    A new pool opens `MIN_SIZE` connections right away.
+    """
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        created = pool is None
+        if created:
+            pool = _pools[key] = ConnectionPool(
+                lambda: _connect(conn_params),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                health_check_seconds=options.get('HEALTH_CHECK_SECONDS', 30),
+            )
+    if created and options.get('MIN_SIZE'):
+        pool.warm(options['MIN_SIZE'])
+    return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool in the process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would block the DROP.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_pool(self):
+        return get_pool(
+            self.alias,
+            self.get_connection_params(),
+            self.settings_dict.get('POOL', {}),
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(
+            self.alias,
+            conn_params,
+            self.settings_dict.get('POOL', {}),
+        )
+        connection = self.pool.get()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level,
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # Closed inside atomic(), the wrapper keeps using it until the
+            # block exits. A failed connection isn't worth keeping.
+            if self.in_atomic_block or self.errors_occurred:
+                self.pool.discard(self.connection)
+            else:
+                self.pool.put(self.connection)
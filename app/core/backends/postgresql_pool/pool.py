@@ -0,0 +1,138 @@
+"""
+Thread safe pool of health checked psycopg2 connections
+"""
+
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Up to `max_size` connections opened by `connect`.
+
+    Idle connections are handed out most recently used first. One idle
+    for longer than `health_check_seconds` runs `SELECT 1` before it is
+    handed out and is replaced if that fails. `get` waits up to
+    `timeout` seconds for a connection once all are in use.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10,
+                 health_check_seconds=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        # (connection, monotonic time it was returned)
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _reserve(self, deadline):
+        """An idle connection, or None after reserving room for a new one."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f'no database connection free after '
+                        f'{self.timeout}s, all {self.max_size} in use'
+                    )
+                self._cond.wait(remaining)
+
+    def _open(self):
+        try:
+            return self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _is_healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_seconds:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def get(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            item = self._reserve(deadline)
+            if item is None:
+                return self._open()
+            connection, returned_at = item
+            if self._is_healthy(connection, returned_at):
+                return connection
+            self.discard(connection)
+
+    def put(self, connection):
+        """Return a connection, rolling back anything left open."""
+        if connection.closed:
+            return self.discard(connection)
+        status = connection.get_transaction_status()
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return self.discard(connection)
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, connection):
+        """Close a connection and free its slot."""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def warm(self, count):
+        """Open connections until `count` are idle, at most `max_size`."""
+        opened = []
+        try:
+            while self.idle + len(opened) < min(count, self.max_size):
+                with self._cond:
+                    if self._size >= self.max_size:
+                        break
+                    self._size += 1
+                opened.append(self._open())
+        finally:
+            for connection in opened:
+                self.put(connection)
+        return self.idle
+
+    def close(self):
+        """Close the idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
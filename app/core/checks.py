@@ -0,0 +1,64 @@
+"""
+System checks of settings that only hold up with several workers
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends that keep nothing outside the current process.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias):
+    """Whether every worker sees what one of them stores in `alias`."""
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches, deploy=True)
+def check_recipe_cache(app_configs, **kwargs):
+    """A cached response must be invalidated in every worker."""
+    if settings.DEBUG or settings.RECIPE_CACHE_TIMEOUT <= 0:
+        return []
+    if is_shared_cache(settings.RECIPE_CACHE_ALIAS):
+        return []
+    return [Error(
+        f'The recipe response cache uses the process local cache '
+        f'{settings.RECIPE_CACHE_ALIAS!r}, the other workers would keep '
+        f'serving stale responses after a write.',
+        hint='Set REDIS_URL, or RECIPE_CACHE_TIMEOUT=0 to turn it off.',
+        id='core.E001',
+    )]
+
+
+@register(Tags.database, Tags.caches, deploy=True)
+def check_replica_pins(app_configs, **kwargs):
+    """Read-your-writes pins must be seen by every worker."""
+    replication = settings.DATABASE_REPLICATION
+    if settings.DEBUG or not replication['REPLICAS']:
+        return []
+    if is_shared_cache(replication['CACHE_ALIAS']):
+        return []
+    return [Error(
+        f'Replica pins are stored in the process local cache '
+        f'{replication["CACHE_ALIAS"]!r}, a read served by another worker '
+        f'would go to a replica that may not have the write yet.',
+        hint='Set REDIS_URL, or DB_REPLICA_PIN_CACHE_ALIAS to a shared '
+             'cache.',
+        id='core.E002',
+    )]
+
+
+@register(Tags.security, Tags.caches, deploy=True)
+def check_login_throttles(app_configs, **kwargs):
+    """Login throttle buckets must be counted once for all workers."""
+    if settings.DEBUG or is_shared_cache('default'):
+        return []
+    return [Error(
+        'Login throttle buckets are stored in the process local default '
+        'cache, each worker would allow the whole login rate.',
+        hint='Set REDIS_URL.',
+        id='core.E003',
+    )]
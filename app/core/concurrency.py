@@ -0,0 +1,70 @@
+"""
+Bounded thread pool running the blocking work of async views
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = None
+_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor, _workers
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _workers = settings.ASYNC_VIEWS['WORKERS']
+                _executor = ThreadPoolExecutor(
+                    max_workers=_workers,
+                    thread_name_prefix='async-views',
+                )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    # The request signals that recycle connections fire on another
+    # thread, so the pool threads clean up their own.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args, **kwargs):
+    """Await `func(*args, **kwargs)` run in the bounded pool.
+
+    At most WORKERS calls run at once, so at most as many database
+    connections are open. The rest wait without holding a thread.
+    """
+    return await sync_to_async(
+        _call,
+        thread_sensitive=False,
+        executor=get_executor(),
+    )(func, args, kwargs)
+
+
+def shutdown():
+    """Close the database connections of the pool threads and stop them."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is None:
+        return
+    # One call per thread, each waits for the others so none runs two.
+    workers = _workers
+    barrier = threading.Barrier(workers)
+
+    def close():
+        barrier.wait()
+        connections.close_all()
+
+    for future in [executor.submit(close) for _ in range(workers)]:
+        future.result()
+    executor.shutdown()
@@ -0,0 +1,268 @@
+"""
+Sampled per view timings, sent as Server-Timing and served as metrics
+
+A sampled request records its wall time, the count and time of its
+database queries, the time its serializers take and its response size.
+The totals per view are served in the Prometheus text format by
+metrics_view.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+
+# Upper bounds in seconds of the request duration histogram.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = ContextVar('instrumentation', default=None)
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class RequestStats:
+    """What a sampled request spent, filled in while it runs."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self._serializing = False
+
+    def serialize(self, func, *args, **kwargs):
+        # Nested serializers are part of the outer one's time.
+        if self._serializing:
+            return func(*args, **kwargs)
+        self._serializing = True
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.serialize_seconds += time.perf_counter() - start
+            self._serializing = False
+
+
+def get_current():
+    """The stats of the request being sampled, or None."""
+    return _current.get()
+
+
+def start():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver adding record_query to the wrappers.
+
+    Installed on the connection rather than around each request, so the
+    queries async views make in core.concurrency's threads are counted.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentedSerializerMixin:
+    """Add the time spent (de)serializing to the sampled request."""
+
+    def to_representation(self, instance):
+        stats = _current.get()
+        if stats is None:
+            return super().to_representation(instance)
+        return stats.serialize(super().to_representation, instance)
+
+    def run_validation(self, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return super().run_validation(*args, **kwargs)
+        return stats.serialize(super().run_validation, *args, **kwargs)
+
+
+def resolve_view(request):
+    """(view, action) that handled the request, view is the class of
+    DRF views, the function of others, None when nothing matched."""
+    match = request.resolver_match
+    if match is None:
+        return None, None
+    func = getattr(match.func, '__wrapped__', match.func)
+    cls = getattr(func, 'cls', None)
+    if cls is None:
+        return func, None
+    method = request.method.lower()
+    actions = getattr(func, 'actions', None) or {}
+    return cls, actions.get(method, method)
+
+
+def view_name(request):
+    """`Class.action` of the view that handled the request."""
+    view, action = resolve_view(request)
+    if view is None:
+        return 'unresolved'
+    name = getattr(view, '__name__', type(view).__name__)
+    return f'{name}.{action}' if action else name
+
+
+def observe(view, method, status, seconds, stats, size):
+    with _metrics_lock:
+        series = _metrics.get((view, method))
+        if series is None:
+            series = _metrics[(view, method)] = {
+                'statuses': {},
+                'buckets': [0] * len(BUCKETS),
+                'seconds': 0.0,
+                'db_queries': 0,
+                'db_seconds': 0.0,
+                'serialize_seconds': 0.0,
+                'response_bytes': 0,
+            }
+        series['statuses'][status] = series['statuses'].get(status, 0) + 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                series['buckets'][i] += 1
+        series['seconds'] += seconds
+        series['db_queries'] += stats.db_queries
+        series['db_seconds'] += stats.db_seconds
+        series['serialize_seconds'] += stats.serialize_seconds
+        series['response_bytes'] += size or 0
+
+
+def get_metrics():
+    with _metrics_lock:
+        return {
+            key: {
+                **series,
+                'statuses': dict(series['statuses']),
+                'buckets': list(series['buckets']),
+            }
+            for key, series in _metrics.items()
+        }
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def server_timing(seconds, stats):
+    return ', '.join([
+        f'app;dur={seconds * 1000:.1f}',
+        f'db;dur={stats.db_seconds * 1000:.1f};'
+        f'desc="{stats.db_queries} queries"',
+        f'serialize;dur={stats.serialize_seconds * 1000:.1f}',
+    ])
+
+
+def _labels(**labels):
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"'),
+        )
+        for name, value in labels.items()
+    )
+    return f'{{{pairs}}}'
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    metrics = sorted(get_metrics().items())
+    lines = []
+
+    _family(lines, 'app_requests_total', 'counter', 'Sampled requests.')
+    for (view, method), series in metrics:
+        for status, count in sorted(series['statuses'].items()):
+            labels = _labels(view=view, method=method, status=status)
+            lines.append(f'app_requests_total{labels} {count}')
+
+    _family(
+        lines,
+        'app_request_duration_seconds',
+        'histogram',
+        'Wall time of sampled requests.',
+    )
+    for (view, method), series in metrics:
+        count = sum(series['statuses'].values())
+        for bound, observed in zip(BUCKETS, series['buckets']):
+            labels = _labels(view=view, method=method, le=bound)
+            lines.append(
+                f'app_request_duration_seconds_bucket{labels} {observed}'
+            )
+        labels = _labels(view=view, method=method, le='+Inf')
+        lines.append(f'app_request_duration_seconds_bucket{labels} {count}')
+        labels = _labels(view=view, method=method)
+        lines.append(
+            f'app_request_duration_seconds_sum{labels} {series["seconds"]}'
+        )
+        lines.append(f'app_request_duration_seconds_count{labels} {count}')
+
+    for key, name, help_text in (
+        ('db_queries', 'app_db_queries_total', 'Database queries.'),
+        ('db_seconds', 'app_db_duration_seconds_total', 'Time in queries.'),
+        (
+            'serialize_seconds',
+            'app_serialize_duration_seconds_total',
+            'Time in serializers.',
+        ),
+        (
+            'response_bytes',
+            'app_response_bytes_total',
+            'Bytes of non streaming responses.',
+        ),
+    ):
+        _family(lines, name, 'counter', help_text)
+        for (view, method), series in metrics:
+            labels = _labels(view=view, method=method)
+            lines.append(f'{name}{labels} {series[key]}')
+
+    _family(
+        lines,
+        'app_instrumentation_sample_rate',
+        'gauge',
+        'Share of requests sampled.',
+    )
+    lines.append(
+        'app_instrumentation_sample_rate '
+        f'{settings.INSTRUMENTATION["SAMPLE_RATE"]}'
+    )
+
+    for prefix, path in settings.INSTRUMENTATION['COLLECTORS'].items():
+        for name, value in sorted(import_string(path)().items()):
+            metric = f'{prefix}_{name}_total'
+            _family(lines, metric, 'counter', f'{prefix} {name}.')
+            lines.append(f'{metric} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Metrics for a scraper on METRICS_IPS, a 404 for anyone else."""
+    allowed = settings.INSTRUMENTATION['METRICS_IPS']
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
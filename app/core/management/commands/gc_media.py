@@ -0,0 +1,107 @@
+"""
+django command to delete media blobs nothing references
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import MediaBlob, Recipe
+
+
+class Command(BaseCommand):
+    help = 'Delete stored recipe images whose reference count dropped to 0.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=3600,
+            help='Seconds a blob must be untouched before it is deleted.',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute reference counts from the recipes first.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.storage = Recipe._meta.get_field('image').storage
+        self.batch_size = options['batch_size']
+        if options['recount']:
+            self.recount()
+
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        deleted = freed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Locked rows make a concurrent save of the same content
+                # wait until the file is gone, then it writes it again.
+                batch = list(
+                    MediaBlob.objects.select_for_update(skip_locked=True)
+                    .filter(
+                        ref_count=0,
+                        touched_at__lt=cutoff,
+                        id__gt=last_id,
+                    )
+                    .order_by('id')[:self.batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                if not options['dry_run']:
+                    for blob in batch:
+                        self.storage.delete(blob.name)
+                    MediaBlob.objects.filter(
+                        id__in=[blob.id for blob in batch],
+                    ).delete()
+            deleted += len(batch)
+            freed += sum(blob.size for blob in batch)
+            self.stdout.write(f'{len(batch)} blobs...')
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} blobs, {freed} bytes'
+        ))
+
+    def recount(self):
+        """Reset every count to what the recipes reference right now.
+
+        Also registers referenced files that predate the blob table. Counts
+        changed by uploads while this runs can be lost, run it when quiet.
+        """
+        counts = Counter()
+        recipes = Recipe.objects.only('image', 'image_variants')
+        for recipe in recipes.iterator(chunk_size=self.batch_size):
+            counts.update(recipe.media_names())
+
+        with transaction.atomic():
+            known = set(MediaBlob.objects.values_list('name', flat=True))
+            MediaBlob.objects.bulk_create(
+                [
+                    MediaBlob(name=name, size=self._size(name))
+                    for name in counts
+                    if name not in known
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            MediaBlob.objects.exclude(ref_count=0).update(ref_count=0)
+            by_count = defaultdict(list)
+            for name, count in counts.items():
+                by_count[count].append(name)
+            for count, names in by_count.items():
+                for start in range(0, len(names), self.batch_size):
+                    MediaBlob.objects.filter(
+                        name__in=names[start:start + self.batch_size],
+                    ).update(ref_count=count)
+        self.stdout.write(f'Recounted {len(counts)} referenced blobs')
+
+    def _size(self, name):
+        return self.storage.size(name) if self.storage.exists(name) else 0
@@ -0,0 +1,29 @@
+"""
+django command to generate the cached OpenAPI schema
+"""
+
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    help = 'Write the OpenAPI schema of this code version to the cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate even if the version is already cached.',
+        )
+
+    def handle(self, *args, **options):
+        version = schema.get_version()
+        for fmt in schema.FORMATS:
+            path = schema.cached_path(version, fmt)
+            if path is not None and not options['force']:
+                self.stdout.write(f'{path} is up to date')
+                continue
+            path = schema.write(version, fmt, schema.generate(fmt))
+            self.stdout.write(f'wrote {path}')
+        self.stdout.write(self.style.SUCCESS(f'Schema {version} ready'))
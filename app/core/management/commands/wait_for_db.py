@@ -5,19 +5,54 @@ django command to wait for DB
 import time
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+INITIAL_DELAY = 0.5
+
 
 class Command(BaseCommand):
+    help = 'Wait for the database, retrying with exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Give up after this many seconds, 0 waits forever.',
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Longest pause between two attempts, in seconds.',
+        )
+
     def handle(self, *args, **options):
+        database = options['database']
         self.stdout.write('waiting for db...')
-        db_up = False
-        while not db_up:
+        started = time.monotonic()
+        delay = INITIAL_DELAY
+        attempts = 0
+        while True:
+            attempts += 1
             try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write('DB unavailable...')
-                time.sleep(1)
+                self.check(databases=[database])
+                break
+            except (Psycopg2Error, OperationalError) as exc:
+                waited = time.monotonic() - started
+                timeout = options['timeout']
+                if timeout and waited + delay > timeout:
+                    raise CommandError(
+                        f'DB unavailable after {attempts} attempts in '
+                        f'{waited:.1f}s: {exc}'
+                    )
+                self.stdout.write(
+                    f'DB unavailable, retrying in {delay:.1f}s...'
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, options['max_delay'])
 
-        self.stdout.write(self.style.SUCCESS('DB is available!!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('DB is available!!'))
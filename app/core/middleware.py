@@ -0,0 +1,110 @@
+"""
+Middleware of the core app
+"""
+
+import asyncio
+import random
+import time
+
+from django.conf import settings
+
+from core import instrumentation, querybudget
+
+
+class InstrumentationMiddleware:
+    """Time a SAMPLE_RATE share of requests, see core.instrumentation.
+
+    Put it first, so the time of the other middleware is counted. Async
+    capable, a sync only middleware first would run every request of an
+    ASGI server in the one thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks this instance as a coroutine function for Django.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        stats, token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        return self.observe(request, response, started, stats)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        stats, token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        return self.observe(request, response, started, stats)
+
+    def sampled(self):
+        rate = settings.INSTRUMENTATION['SAMPLE_RATE']
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def observe(self, request, response, started, stats):
+        seconds = time.perf_counter() - started
+        instrumentation.observe(
+            instrumentation.view_name(request),
+            request.method,
+            response.status_code,
+            seconds,
+            stats,
+            None if response.streaming else len(response.content),
+        )
+        if settings.INSTRUMENTATION['SERVER_TIMING']:
+            response['Server-Timing'] = instrumentation.server_timing(
+                seconds,
+                stats,
+            )
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Check the queries of each request, see core.querybudget."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.QUERY_BUDGET['ENABLED']:
+            return self.get_response(request)
+        log, token = querybudget.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            querybudget.stop(token)
+        querybudget.check(request, log)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.QUERY_BUDGET['ENABLED']:
+            return await self.get_response(request)
+        log, token = querybudget.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            querybudget.stop(token)
+        querybudget.check(request, log)
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:29
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate (user, name) rows into the oldest one."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name in ('tags', 'ingrediants'):
+        through = Recipe._meta.get_field(field_name).remote_field.through
+        model = Recipe._meta.get_field(field_name).related_model
+        fk_name = f'{model._meta.model_name}_id'
+        duplicates = model.objects.values('user', 'name').annotate(
+            total=Count('id'),
+            keep_id=Min('id'),
+        ).filter(total__gt=1)
+        for duplicate in duplicates:
+            keep_id = duplicate['keep_id']
+            drop_ids = list(
+                model.objects.filter(
+                    user=duplicate['user'],
+                    name=duplicate['name'],
+                ).exclude(id=keep_id).values_list('id', flat=True)
+            )
+            recipe_ids = set(
+                through.objects.filter(
+                    **{f'{fk_name}__in': drop_ids}
+                ).values_list('recipe_id', flat=True)
+            )
+            recipe_ids -= set(
+                through.objects.filter(
+                    **{fk_name: keep_id}
+                ).values_list('recipe_id', flat=True)
+            )
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{fk_name: keep_id})
+                for recipe_id in recipe_ids
+            ])
+            model.objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_recipe_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names,
+            migrations.RunPython.noop,
+        ),
+    ]
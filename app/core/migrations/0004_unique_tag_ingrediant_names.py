@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_merge_duplicate_tag_ingrediant_names'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingrediant',
+            name='ingrediant_user_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='tag_user_name_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='ingrediant',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='ingrediant_user_name_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='tag_user_name_unique'),
+        ),
+    ]
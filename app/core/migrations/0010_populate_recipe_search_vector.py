@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:50
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+SEARCH_CONFIG = 'english'
+
+
+# recipe.search as it was when this migration was written, inlined so
+# later changes to it don't change what migrating a new database does.
+def _names(model):
+    names = model.objects.filter(
+        recipe=OuterRef('pk'),
+    ).values('recipe').annotate(
+        names=StringAgg('name', ' '),
+    ).values('names')
+    return Coalesce(Subquery(names), Value(''))
+
+
+def search_vector(tag_model, ingrediant_model):
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            _names(tag_model),
+            _names(ingrediant_model),
+            weight='C',
+            config=SEARCH_CONFIG,
+        )
+    )
+
+
+def populate_search_vector(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    Tag = apps.get_model('core', 'Tag')
+    Ingrediant = apps.get_model('core', 'Ingrediant')
+    ids = Recipe.objects.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        Recipe.objects.filter(id__in=batch).update(
+            search_vector=search_vector(Tag, Ingrediant),
+        )
+        last_id = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            populate_search_vector,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:10
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+EXTENSIONS = ('pg_trgm', 'btree_gin')
+INDEXES = {
+    'tag': GinIndex(
+        fields=['user', 'name'],
+        opclasses=['int8_ops', 'gin_trgm_ops'],
+        name='tag_user_name_trgm_idx',
+    ),
+    'ingrediant': GinIndex(
+        fields=['user', 'name'],
+        opclasses=['int8_ops', 'gin_trgm_ops'],
+        name='ingrediant_user_name_trgm_idx',
+    ),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Skipped on servers without the contrib extensions.
+
+    recipe.autocomplete falls back to prefix matching there.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_available_extensions WHERE name IN %s',
+            [EXTENSIONS],
+        )
+        if cursor.fetchone()[0] < len(EXTENSIONS):
+            return
+    for extension in EXTENSIONS:
+        schema_editor.execute(f'CREATE EXTENSION IF NOT EXISTS {extension}')
+    for model_name, index in INDEXES.items():
+        schema_editor.add_index(apps.get_model('core', model_name), index)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for index in INDEXES.values():
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_populate_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    create_trigram_indexes,
+                    drop_trigram_indexes,
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in INDEXES.items()
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_trigram_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingrediant',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='ingrediant',
+            index=models.Index(fields=['user', '-recipe_count', '-name', '-id'], name='ingrediant_user_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', '-name', '-id'], name='tag_user_popular_idx'),
+        ),
+    ]
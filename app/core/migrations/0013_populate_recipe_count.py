@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:57
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+# recipe.usage as it was when this migration was written, inlined so
+# later changes to it don't change what migrating a new database does.
+def recipe_count_subquery(model, through, column):
+    counts = through.objects.filter(
+        **{column: OuterRef('pk')}
+    ).order_by().values(column).annotate(total=Count('*')).values('total')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()),
+        Value(0),
+    )
+
+
+def populate_recipe_count(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name in ('tags', 'ingrediants'):
+        field = Recipe._meta.get_field(field_name)
+        model = field.related_model
+        model.objects.update(recipe_count=recipe_count_subquery(
+            model,
+            field.remote_field.through,
+            field.m2m_reverse_name(),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            populate_recipe_count,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:58
+
+from django.db import migrations
+
+# (tag_id, recipe_id) lets the match=all grouping in recipe.filters read
+# the recipe ids of the requested tags from the index alone. The unique
+# (recipe_id, tag_id) constraint already serves the EXISTS lookups.
+THROUGH_INDEXES = [
+    ('core_recipe_tags', 'tag_id', 'recipe_tags_tag_recipe_idx'),
+    (
+        'core_recipe_ingrediants',
+        'ingrediant_id',
+        'recipe_ingrediants_ingrediant_recipe_idx',
+    ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_populate_recipe_count'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({column}, recipe_id)',
+            f'DROP INDEX IF EXISTS {name}',
+        )
+        for table, column, name in THROUGH_INDEXES
+    ]
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 # Create your models here.
@@ -7,12 +9,17 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.conf import settings
+from django.utils import timezone
 import uuid
 import os
 
+from core.storage import recipe_image_storage
+
 def recipe_image_file_path(instance, filename):
     ext = os.path.splitext(filename)[1]
-    filename = f'{uuid.uuid4()}{ext}'
+    # Hashed uploads are content addressed, identical images share a file.
+    name = getattr(instance, 'image_hash', '') or uuid.uuid4()
+    filename = f'{name}{ext}'
 
     return os.path.join('uploads', 'recipe', filename)
 
@@ -45,6 +52,15 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 # class UserAdmin()
 class Recipe(models.Model):
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -56,10 +72,50 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     ingrediants = models.ManyToManyField('Ingrediant')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=recipe_image_storage,
+    )
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True,
+    )
+    image_variants = models.JSONField(default=dict, blank=True)
+    image_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Kept current by recipe.signals, see recipe.search.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            # `ordering` of the recipe list, scanned backwards for `-`.
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='recipe_user_title_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='recipe_user_price_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def media_names(self):
+        """Names of the stored blobs the recipe references."""
+        names = [self.image.name] if self.image else []
+        for variants in self.image_variants.values():
+            names.extend(variants.values())
+        return names
     
 class Tag(models.Model):
     name = models.CharField(max_length=255)
@@ -67,6 +123,31 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of recipes using it, kept current by recipe.signals.
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='tag_user_name_unique',
+            ),
+        ]
+        indexes = [
+            # Created by migration 0011 only where pg_trgm and btree_gin
+            # exist.
+            GinIndex(
+                fields=['user', 'name'],
+                opclasses=['int8_ops', 'gin_trgm_ops'],
+                name='tag_user_name_trgm_idx',
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', '-name', '-id'],
+                name='tag_user_popular_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 class Ingrediant(models.Model):
@@ -75,5 +156,51 @@ class Ingrediant(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of recipes using it, kept current by recipe.signals.
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='ingrediant_user_name_unique',
+            ),
+        ]
+        indexes = [
+            # Created by migration 0011 only where pg_trgm and btree_gin
+            # exist.
+            GinIndex(
+                fields=['user', 'name'],
+                opclasses=['int8_ops', 'gin_trgm_ops'],
+                name='ingrediant_user_name_trgm_idx',
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', '-name', '-id'],
+                name='ingrediant_user_popular_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class MediaBlob(models.Model):
+    """A file in content addressed storage and how many rows use it."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    # Bumped whenever the blob is saved again, the GC skips recent blobs
+    # so an upload is not collected before its reference is counted.
+    touched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['ref_count', 'touched_at'],
+                name='mediablob_gc_idx',
+            ),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
@@ -0,0 +1,185 @@
+"""
+Query budgets, repeated query (N+1) detection and slow query logging
+
+Views declare `max_queries`, the most queries a request may make, and
+`constant_queries`, that a read makes no query shape more than once so
+its count doesn't grow with the number of results. While QUERY_BUDGET
+is ENABLED every request records its queries, logs the shapes repeated
+REPEAT_THRESHOLD times with the stack that made them and checks the
+budget of its view. Going over it is logged, or raised as
+QueryBudgetExceeded with RAISE, which the test runner turns on.
+
+Queries slower than SLOW_QUERY_MS are logged whether or not a request
+is recorded, with their plan when EXPLAIN is on.
+"""
+
+import logging
+import re
+import time
+import traceback
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from core.instrumentation import resolve_view
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('query_log', default=None)
+_explaining = ContextVar('explaining', default=False)
+
+# `IN (%s, %s, ...)` has as many placeholders as values, one shape.
+_PLACEHOLDERS = re.compile(r'\(%s(?:, %s)*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def shape(sql):
+    return _PLACEHOLDERS.sub('(%s, ...)', sql)
+
+
+class QueryLog:
+    """The queries of one request, by shape."""
+
+    def __init__(self, repeat_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.shapes = {}
+        self.stacks = {}
+
+    def add(self, sql):
+        key = shape(sql)
+        self.count += 1
+        seen = self.shapes[key] = self.shapes.get(key, 0) + 1
+        if seen == 2:
+            self.stacks[key] = _project_stack()
+
+    def repeated(self, threshold=None):
+        """{shape: count} of the shapes run at least `threshold` times."""
+        threshold = threshold or self.repeat_threshold
+        return {
+            key: count for key, count in self.shapes.items()
+            if count >= threshold
+        }
+
+
+def _project_stack():
+    # Only the frames of this project, those are the ones to fix.
+    return ''.join(traceback.format_list([
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(str(settings.BASE_DIR))
+        and frame.filename != __file__
+    ]))
+
+
+def get_current():
+    return _current.get()
+
+
+def start():
+    log = QueryLog(settings.QUERY_BUDGET['REPEAT_THRESHOLD'])
+    return log, _current.set(log)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    log = _current.get()
+    if log is not None:
+        log.add(sql)
+    slow_ms = settings.QUERY_BUDGET['SLOW_QUERY_MS']
+    if not slow_ms:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms >= slow_ms:
+        _log_slow_query(context['connection'], sql, params, many, elapsed_ms)
+    return result
+
+
+def _log_slow_query(connection, sql, params, many, elapsed_ms):
+    plan = ''
+    if (
+        settings.QUERY_BUDGET['EXPLAIN']
+        and not many
+        and sql.lstrip().upper().startswith('SELECT')
+        and not connection.needs_rollback
+    ):
+        token = _explaining.set(True)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.explain_query_prefix()} {sql}',
+                    params,
+                )
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+        except Exception:
+            logger.debug('Could not explain the slow query', exc_info=True)
+        finally:
+            _explaining.reset(token)
+    logger.warning(
+        'Slow query (%.0fms): %s\nparams: %r%s',
+        elapsed_ms,
+        sql,
+        params,
+        f'\n{plan}' if plan else '',
+    )
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver adding record_query to the wrappers."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_budget(request):
+    """(max_queries, constant_queries) of the view and action.
+
+    `max_queries` is a count for every action, or a dict of counts by
+    action where the actions left out have no budget.
+    """
+    view, action = resolve_view(request)
+    max_queries = getattr(view, 'max_queries', None)
+    if isinstance(max_queries, dict):
+        max_queries = max_queries.get(action)
+    return max_queries, getattr(view, 'constant_queries', False)
+
+
+def check(request, log):
+    """Log the repeated queries and enforce the view's budget."""
+    view = request.get_full_path()
+    for key, count in log.repeated().items():
+        logger.warning(
+            'Query run %d times in %s %s, N+1?\n%s\n%s',
+            count,
+            request.method,
+            view,
+            key,
+            log.stacks.get(key, ''),
+        )
+
+    max_queries, constant = get_budget(request)
+    problems = []
+    if max_queries is not None and log.count > max_queries:
+        problems.append(f'{log.count} queries, the budget is {max_queries}')
+    if constant and request.method in ('GET', 'HEAD'):
+        problems.extend(
+            f'{count} queries of the same shape, the count grows with '
+            f'the results:\n{key}\n{log.stacks.get(key, "")}'
+            for key, count in log.repeated(threshold=2).items()
+        )
+    if not problems:
+        return
+    message = f'{request.method} {view} is over its query budget: ' + (
+        '\n'.join(problems)
+    )
+    if settings.QUERY_BUDGET['RAISE']:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,79 @@
+"""
+Database router sending the reads of safe API requests to replicas
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+PIN_KEY = 'db:pin:{user_id}'
+
+# Set for the duration of a request that may read from a replica.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def get_replicas():
+    return settings.DATABASE_REPLICATION['REPLICAS']
+
+
+def _cache():
+    return caches[settings.DATABASE_REPLICATION['CACHE_ALIAS']]
+
+
+def enable_replica_reads():
+    """Route reads to replicas until `disable_replica_reads(token)`."""
+    return _replica_reads.set(True)
+
+
+def disable_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    token = enable_replica_reads()
+    try:
+        yield
+    finally:
+        disable_replica_reads(token)
+
+
+def pin_to_primary(user_id):
+    """Read the user's data from the primary until replicas caught up."""
+    seconds = settings.DATABASE_REPLICATION['PIN_SECONDS']
+    if get_replicas() and seconds > 0:
+        _cache().set(PIN_KEY.format(user_id=user_id), True, seconds)
+
+
+def is_pinned(user_id):
+    if not get_replicas():
+        return False
+    return bool(_cache().get(PIN_KEY.format(user_id=user_id)))
+
+
+class ReplicaRouter:
+    """Reads go to a random replica while replica reads are enabled.
+
+    Everything else, writes and reads outside such a request included,
+    uses `default`. Replicas are never migrated directly, they get the
+    schema from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and _replica_reads.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # All aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
@@ -0,0 +1,166 @@
+"""
+OpenAPI schema generated once per code version and served from cache
+
+drf_spectacular is only imported when a schema has to be generated or
+the docs page is shown, not while URLs load. So DEFAULT_SCHEMA_CLASS
+is only pointed at its AutoSchema here, and the views' annotations
+live in the `openapi` module of their app, imported before generating.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import autodiscover_modules
+from rest_framework.settings import api_settings
+from django.views.decorators.http import condition, require_safe
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'yaml': 'application/vnd.oai.openapi',
+    'json': 'application/vnd.oai.openapi+json',
+}
+
+_memory = {}
+_lock = threading.Lock()
+_version = None
+
+
+def get_version():
+    """SCHEMA_CACHE VERSION, or a digest of the project's source files."""
+    global _version
+    if _version is None:
+        _version = settings.SCHEMA_CACHE['VERSION'] or _source_digest()
+    return _version
+
+
+def _source_digest():
+    import drf_spectacular
+
+    digest = hashlib.sha256(drf_spectacular.__version__.encode())
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        dirs[:] = sorted(
+            name for name in dirs
+            if name not in ('tests', 'migrations', '__pycache__')
+        )
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                relpath = os.path.relpath(path, settings.BASE_DIR)
+                digest.update(relpath.encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _path(version, fmt):
+    return os.path.join(
+        settings.SCHEMA_CACHE['DIR'],
+        f'schema-{version}.{fmt}',
+    )
+
+
+def cached_path(version, fmt):
+    """The cache file of the version, if it was written."""
+    path = _path(version, fmt)
+    return path if os.path.exists(path) else None
+
+
+def generate(fmt):
+    """Render the schema from the viewsets, the slow path."""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.openapi import AutoSchema
+    from drf_spectacular.renderers import (
+        OpenApiJsonRenderer,
+        OpenApiYamlRenderer,
+    )
+
+    # Before the annotations, extend_schema subclasses it.
+    api_settings.DEFAULT_SCHEMA_CLASS = AutoSchema
+    autodiscover_modules('openapi')
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    renderer = OpenApiJsonRenderer if fmt == 'json' else OpenApiYamlRenderer
+    return renderer().render(schema, renderer_context={})
+
+
+def write(version, fmt, content):
+    """Store the rendered schema for other processes and restarts."""
+    path = _path(version, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}.part'
+    with open(partial, 'wb') as f:
+        f.write(content)
+    os.replace(partial, path)
+    return path
+
+
+def _load(version, fmt):
+    try:
+        with open(_path(version, fmt), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    content = generate(fmt)
+    try:
+        write(version, fmt, content)
+    except OSError:
+        logger.warning('Could not write the schema cache', exc_info=True)
+    return content
+
+
+def get_schema(fmt='yaml'):
+    """The rendered schema and its ETag, from memory, disk or generated."""
+    key = (get_version(), fmt)
+    cached = _memory.get(key)
+    if cached is None:
+        with _lock:
+            cached = _memory.get(key)
+            if cached is None:
+                content = _load(*key)
+                etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+                cached = _memory[key] = (content, etag)
+    return cached
+
+
+def clear():
+    """Forget the in-process copies."""
+    global _version
+    with _lock:
+        _memory.clear()
+        _version = None
+
+
+def _format(request):
+    fmt = request.GET.get('format')
+    if fmt not in FORMATS:
+        accept = request.META.get('HTTP_ACCEPT', '')
+        fmt = 'json' if 'json' in accept else 'yaml'
+    return fmt
+
+
+@require_safe
+@condition(etag_func=lambda request: get_schema(_format(request))[1])
+def schema_view(request):
+    fmt = _format(request)
+    content, _ = get_schema(fmt)
+    response = HttpResponse(content, content_type=FORMATS[fmt])
+    response['Vary'] = 'Accept'
+    return response
+
+
+_docs_view = None
+
+
+def docs_view(request, *args, **kwargs):
+    """Swagger UI, loading drf_spectacular on the first visit."""
+    global _docs_view
+    if _docs_view is None:
+        from drf_spectacular.views import SpectacularSwaggerView
+
+        _docs_view = SpectacularSwaggerView.as_view(url_name='api-schema')
+    return _docs_view(request, *args, **kwargs)
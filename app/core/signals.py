@@ -0,0 +1,33 @@
+"""
+Signal handlers for core models
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import evict_tokens, forget_token_key
+from core.models import Recipe
+from core.storage import update_references
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    evict_tokens(instance.key)
+    forget_token_key(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached snapshots so is_active and password changes apply."""
+    if created:
+        return
+    evict_tokens(
+        *Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_media(sender, instance, **kwargs):
+    update_references(removed=instance.media_names())
@@ -0,0 +1,87 @@
+"""
+Content addressed media storage with reference counted blobs
+"""
+
+import hashlib
+import os
+import uuid
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+def _blobs():
+    return apps.get_model('core', 'MediaBlob').objects
+
+
+def content_hash(content):
+    """sha256 of a file, reusing the digest an upload handler computed."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Store every file under the sha256 of its content.
+
+    Saving content that is stored already only returns its name. Each
+    file has a MediaBlob row, callers count references to it through
+    `update_references` and `gc_media` deletes the unreferenced ones.
+    `delete` still removes the file right away, whoever references it.
+    """
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, content_hash(content) + ext)
+
+        # Touch the row before checking the file, this waits for a GC run
+        # that holds the row and is about to delete the file.
+        touched = _blobs().filter(name=name).update(
+            touched_at=timezone.now(),
+        )
+        if not touched:
+            _blobs().bulk_create(
+                [_blobs().model(name=name, size=content.size)],
+                ignore_conflicts=True,
+            )
+        if self.exists(name):
+            return name
+        # Write aside and rename, so a blob is never visible half written.
+        # Racing writers store the same bytes, the last rename wins.
+        partial = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(partial), self.path(name))
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, see _save.
+        return name
+
+
+def recipe_image_storage():
+    return ContentAddressedStorage()
+
+
+def update_references(added=(), removed=()):
+    """Adjust MediaBlob.ref_count by the names gained and lost."""
+    delta = Counter(name for name in added if name)
+    delta.subtract(name for name in removed if name)
+    by_amount = defaultdict(list)
+    for name, amount in delta.items():
+        if amount:
+            by_amount[amount].append(name)
+    for amount, names in by_amount.items():
+        _blobs().filter(name__in=names).update(
+            ref_count=Greatest(F('ref_count') + amount, Value(0)),
+        )
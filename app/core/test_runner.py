@@ -0,0 +1,23 @@
+"""
+Test runner failing the tests that go over a view's query budget
+"""
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget = override_settings(QUERY_BUDGET={
+            **settings.QUERY_BUDGET,
+            'ENABLED': True,
+            'RAISE': True,
+        })
+        self._query_budget.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._query_budget.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,111 @@
+"""
+tests for the cached token authentication
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TTLCache,
+    get_local_cache,
+)
+
+ME_URL = reverse('user:me')
+
+
+def create_user(email='user@example.com', password='userpass'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class TTLCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=2, ttl=-1)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        get_local_cache().clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_second_lookup_skips_database(self):
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_returned_user_is_a_copy(self):
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        user.name = 'changed'
+
+        user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user.name, '')
+
+    def test_invalid_token(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+    def test_deleted_token_evicted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_evicted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_password_change_via_me_evicts(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        client.get(ME_URL)
+
+        res = client.patch(ME_URL, {'password': 'newpassword'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(get_local_cache().get(self.token.key))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpassword'))
+
+    def test_name_update_keeps_password(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        client.get(ME_URL)
+
+        res = client.patch(ME_URL, {'name': 'new name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'new name')
+        self.assertTrue(self.user.check_password('userpass'))
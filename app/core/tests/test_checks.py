@@ -0,0 +1,83 @@
+"""
+tests for the system checks
+"""
+
+from django.test import SimpleTestCase, override_settings
+
+from core import checks
+
+LOCMEM = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+SHARED = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://cache:6379/0',
+    },
+}
+
+
+@override_settings(DEBUG=False, CACHES=LOCMEM, RECIPE_CACHE_ALIAS='default')
+class RecipeCacheCheckTests(SimpleTestCase):
+
+    def test_local_cache_refused(self):
+        with override_settings(RECIPE_CACHE_TIMEOUT=300):
+            errors = checks.check_recipe_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    def test_shared_cache(self):
+        with override_settings(RECIPE_CACHE_TIMEOUT=300, CACHES=SHARED):
+            self.assertEqual(checks.check_recipe_cache(None), [])
+
+    def test_disabled_or_debug(self):
+        with override_settings(RECIPE_CACHE_TIMEOUT=0):
+            self.assertEqual(checks.check_recipe_cache(None), [])
+        with override_settings(RECIPE_CACHE_TIMEOUT=300, DEBUG=True):
+            self.assertEqual(checks.check_recipe_cache(None), [])
+
+
+@override_settings(DEBUG=False, CACHES=LOCMEM)
+class ReplicaPinCheckTests(SimpleTestCase):
+
+    def replication(self, replicas):
+        return {
+            'REPLICAS': replicas,
+            'PIN_SECONDS': 10,
+            'CACHE_ALIAS': 'default',
+        }
+
+    def test_local_cache_refused(self):
+        with override_settings(
+            DATABASE_REPLICATION=self.replication(['replica_1']),
+        ):
+            errors = checks.check_replica_pins(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E002'])
+
+    def test_shared_cache(self):
+        with override_settings(
+            DATABASE_REPLICATION=self.replication(['replica_1']),
+            CACHES=SHARED,
+        ):
+            self.assertEqual(checks.check_replica_pins(None), [])
+
+    def test_no_replicas(self):
+        with override_settings(DATABASE_REPLICATION=self.replication([])):
+            self.assertEqual(checks.check_replica_pins(None), [])
+
+
+@override_settings(DEBUG=False)
+class LoginThrottleCheckTests(SimpleTestCase):
+
+    def test_local_cache_refused(self):
+        with override_settings(CACHES=LOCMEM):
+            errors = checks.check_login_throttles(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E003'])
+
+    def test_shared_cache(self):
+        with override_settings(CACHES=SHARED):
+            self.assertEqual(checks.check_login_throttles(None), [])
@@ -2,11 +2,12 @@
 test django commands
 """
 
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
@@ -24,4 +25,23 @@ class CommandTests(SimpleTestCase):
             [OperationalError] * 3 + [True]
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_check):
+        patched_check.side_effect = [OperationalError] * 5 + [True]
+
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(
+            [args[0] for args, _ in patched_sleep.call_args_list],
+            [0.5, 1, 2, 4, 5],
+        )
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_check):
+        patched_check.side_effect = OperationalError('refused')
+
+        with self.assertRaisesMessage(CommandError, 'after 4 attempts'):
+            call_command('wait_for_db', '--timeout', '2.5', stdout=StringIO())
+        self.assertEqual(patched_sleep.call_count, 3)
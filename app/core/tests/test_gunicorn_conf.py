@@ -0,0 +1,65 @@
+"""
+tests for the gunicorn settings
+"""
+
+import os
+import runpy
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+CONF_PATH = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+
+def load_conf(**environ):
+    with patch.dict(os.environ, environ), \
+            patch('os.sched_getaffinity', return_value={0, 1}, create=True):
+        return runpy.run_path(CONF_PATH)
+
+
+class GunicornConfTests(SimpleTestCase):
+    def test_wsgi_defaults(self):
+        conf = load_conf()
+
+        self.assertEqual(conf['wsgi_app'], 'app.wsgi:application')
+        self.assertEqual(conf['worker_class'], 'gthread')
+        self.assertEqual(conf['workers'], 5)
+        self.assertTrue(conf['preload_app'])
+        self.assertGreater(conf['max_requests'], 0)
+
+    def test_uvicorn_workers(self):
+        conf = load_conf(GUNICORN_WORKER_CLASS='uvicorn')
+
+        self.assertEqual(conf['wsgi_app'], 'app.asgi:application')
+        self.assertEqual(
+            conf['worker_class'],
+            'uvicorn.workers.UvicornWorker',
+        )
+        self.assertEqual(conf['workers'], 2)
+
+    def test_environment_overrides(self):
+        conf = load_conf(
+            GUNICORN_WORKERS='3',
+            GUNICORN_PRELOAD='0',
+            GUNICORN_MAX_REQUESTS='0',
+        )
+
+        self.assertEqual(conf['workers'], 3)
+        self.assertFalse(conf['preload_app'])
+        self.assertEqual(conf['max_requests'], 0)
+
+    def test_refuses_to_start_without_allowed_hosts(self):
+        conf = load_conf()
+
+        with patch.dict(os.environ, {'DEBUG': '0', 'ALLOWED_HOSTS': ''}):
+            with self.assertRaisesMessage(SystemExit, 'ALLOWED_HOSTS'):
+                conf['on_starting'](None)
+
+    def test_starts_with_allowed_hosts(self):
+        conf = load_conf()
+
+        with patch.dict(os.environ, {'DEBUG': '0', 'ALLOWED_HOSTS': 'a.io'}):
+            conf['on_starting'](None)
+        with patch.dict(os.environ, {'DEBUG': '1', 'ALLOWED_HOSTS': ''}):
+            conf['on_starting'](None)
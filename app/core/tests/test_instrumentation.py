@@ -0,0 +1,179 @@
+"""
+Docstring for app.core.tests.test_instrumentation
+"""
+
+import asyncio
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import path, reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import instrumentation
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+METRICS_URL = reverse('metrics')
+
+INSTRUMENTATION = {
+    'SAMPLE_RATE': 1,
+    'SERVER_TIMING': True,
+    'METRICS_IPS': ['127.0.0.1'],
+    'COLLECTORS': {'recipe_cache': 'recipe.cache.get_metrics'},
+}
+
+_running = {'now': 0, 'most': 0}
+
+
+async def slow_view(request):
+    """Count the requests in it at once."""
+    _running['now'] += 1
+    _running['most'] = max(_running['most'], _running['now'])
+    try:
+        await asyncio.sleep(0.05)
+    finally:
+        _running['now'] -= 1
+    return HttpResponse('slow')
+
+
+urlpatterns = [path('slow/', slow_view)]
+
+
+async def get_concurrently(count):
+    """The most requests to slow_view that ran at once of `count`."""
+    _running['most'] = 0
+    client = AsyncClient()
+    responses = await asyncio.gather(*(
+        client.get('/slow/') for _ in range(count)
+    ))
+    return _running['most'], responses
+
+
+@override_settings(INSTRUMENTATION=INSTRUMENTATION, RECIPE_CACHE_TIMEOUT=0)
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        instrumentation.reset_metrics()
+        self.addCleanup(instrumentation.reset_metrics)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'userpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+
+    def test_server_timing(self):
+        self.create_recipe()
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timing = res['Server-Timing']
+        self.assertIn('app;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('serialize;dur=', timing)
+
+    def test_metrics_per_view(self):
+        self.create_recipe()
+
+        res = self.client.get(RECIPE_URL)
+
+        series = instrumentation.get_metrics()[('RecipeViewSet.list', 'GET')]
+        self.assertEqual(series['statuses'], {200: 1})
+        self.assertGreater(series['db_queries'], 0)
+        self.assertGreater(series['serialize_seconds'], 0)
+        self.assertEqual(series['response_bytes'], len(res.content))
+        self.assertEqual(series['buckets'][-1], 1)
+
+    def test_api_view_name(self):
+        self.client.post(
+            TOKEN_URL,
+            {'email': 'user@example.com', 'password': 'wrong'},
+        )
+
+        self.assertIn(
+            ('CreateTokenView.post', 'POST'),
+            instrumentation.get_metrics(),
+        )
+
+    def test_not_sampled(self):
+        config = {**INSTRUMENTATION, 'SAMPLE_RATE': 0}
+        with override_settings(INSTRUMENTATION=config):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(instrumentation.get_metrics(), {})
+
+    def test_server_timing_disabled(self):
+        config = {**INSTRUMENTATION, 'SERVER_TIMING': False}
+        with override_settings(INSTRUMENTATION=config):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertIn(
+            ('RecipeViewSet.list', 'GET'),
+            instrumentation.get_metrics(),
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], instrumentation.CONTENT_TYPE)
+        body = res.content.decode()
+        self.assertIn(
+            'app_requests_total{view="RecipeViewSet.list",method="GET",'
+            'status="200"} 1',
+            body,
+        )
+        self.assertIn('app_request_duration_seconds_bucket{', body)
+        self.assertIn('recipe_cache_hits_total', body)
+        self.assertIn('recipe_cache_misses_total', body)
+
+    def test_metrics_not_local(self):
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(
+    INSTRUMENTATION=INSTRUMENTATION,
+    MIDDLEWARE=['core.middleware.InstrumentationMiddleware'],
+    ROOT_URLCONF=__name__,
+)
+class InstrumentationAsyncTests(SimpleTestCase):
+
+    def setUp(self):
+        instrumentation.reset_metrics()
+        self.addCleanup(instrumentation.reset_metrics)
+
+    async def test_concurrent_requests_overlap(self):
+        most, responses = await get_concurrently(3)
+
+        self.assertEqual(most, 3)
+        for res in responses:
+            self.assertIn('app;dur=', res['Server-Timing'])
+        self.assertEqual(
+            instrumentation.get_metrics()[('slow_view', 'GET')]['statuses'],
+            {200: 3},
+        )
@@ -83,4 +83,10 @@ class ModelTests(TestCase):
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpeg')
 
+    def test_recipe_file_name_content_hash(self):
+        recipe = models.Recipe(image_hash='abc123')
+        file_path = models.recipe_image_file_path(recipe, 'example.jpg')
+
+        self.assertEqual(file_path, 'uploads/recipe/abc123.jpg')
+
     
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+tests for the pooled postgresql backend
+"""
+
+from unittest.mock import MagicMock
+
+import psycopg2
+from psycopg2 import extensions
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.backends.postgresql_pool.base import DatabaseWrapper
+from core.backends.postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+
+def fake_connection():
+    conn = MagicMock(closed=0)
+    conn.get_transaction_status.return_value = (
+        extensions.TRANSACTION_STATUS_IDLE
+    )
+    return conn
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.connect = MagicMock(side_effect=lambda: fake_connection())
+        self.pool = ConnectionPool(self.connect, max_size=2, timeout=0)
+
+    def test_reuses_returned_connection(self):
+        conn = self.pool.get()
+        self.pool.put(conn)
+
+        self.assertIs(self.pool.get(), conn)
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_waits_then_times_out_when_exhausted(self):
+        self.pool.get()
+        self.pool.get()
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.get()
+
+    def test_discard_frees_slot(self):
+        conn = self.pool.get()
+        self.pool.get()
+        self.pool.discard(conn)
+
+        self.pool.get()
+        self.assertEqual(self.pool.size, 2)
+        conn.close.assert_called_once_with()
+
+    def test_closed_connection_is_replaced(self):
+        conn = self.pool.get()
+        self.pool.put(conn)
+        conn.closed = 1
+
+        self.assertIsNot(self.pool.get(), conn)
+        self.assertEqual(self.pool.size, 1)
+
+    def test_health_check_after_idle(self):
+        self.pool.health_check_seconds = 0
+        conn = self.pool.get()
+        self.pool.put(conn)
+        conn.cursor.side_effect = psycopg2.OperationalError
+
+        self.assertIsNot(self.pool.get(), conn)
+
+    def test_put_rolls_back_open_transaction(self):
+        conn = self.pool.get()
+        conn.get_transaction_status.return_value = (
+            extensions.TRANSACTION_STATUS_INERROR
+        )
+
+        self.pool.put(conn)
+
+        conn.rollback.assert_called_once_with()
+        self.assertEqual(self.pool.idle, 1)
+
+    def test_failed_connect_frees_slot(self):
+        self.connect.side_effect = psycopg2.OperationalError
+
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.get()
+        self.assertEqual(self.pool.size, 0)
+
+    def test_warm(self):
+        self.assertEqual(self.pool.warm(5), 2)
+        self.assertEqual(self.connect.call_count, 2)
+
+
+class PooledBackendTests(TestCase):
+    def setUp(self):
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'core.backends.postgresql_pool',
+            'POOL': {'MAX_SIZE': 2},
+        }
+        self.wrapper = DatabaseWrapper(settings_dict, connection.alias)
+        self.addCleanup(self._close_pool)
+
+    def _close_pool(self):
+        self.wrapper.close()
+        self.wrapper.get_pool().close()
+
+    def test_close_returns_connection_to_pool(self):
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertFalse(raw.closed)
+        self.assertEqual(self.wrapper.pool.idle, 1)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+        self.assertIs(self.wrapper.connection, raw)
@@ -0,0 +1,198 @@
+"""
+Docstring for app.core.tests.test_querybudget
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import querybudget
+from core.models import Recipe, Tag
+from core.tests.test_instrumentation import get_concurrently
+from recipe.serializers import RecipeSerializer
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+QUERY_BUDGET = {
+    'ENABLED': True,
+    'RAISE': True,
+    'REPEAT_THRESHOLD': 3,
+    'SLOW_QUERY_MS': 0,
+    'EXPLAIN': False,
+}
+
+
+def make_request(path, method='get'):
+    request = getattr(RequestFactory(), method)(path)
+    request.resolver_match = resolve(path)
+    return request
+
+
+def make_log(*queries):
+    log = querybudget.QueryLog(QUERY_BUDGET['REPEAT_THRESHOLD'])
+    for sql in queries:
+        log.add(sql)
+    return log
+
+
+@override_settings(QUERY_BUDGET=QUERY_BUDGET)
+class QueryBudgetCheckTests(TestCase):
+
+    def test_shape_collapses_in_lists(self):
+        self.assertEqual(
+            querybudget.shape('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            querybudget.shape('SELECT 1 WHERE id IN (%s)'),
+        )
+
+    def test_within_budget(self):
+        log = make_log('SELECT a', 'SELECT b')
+
+        querybudget.check(make_request(RECIPE_URL), log)
+
+    def test_over_budget_raises(self):
+        log = make_log(*(f'SELECT {i}' for i in range(6)))
+
+        with self.assertRaisesMessage(
+            querybudget.QueryBudgetExceeded,
+            '6 queries, the budget is 5',
+        ):
+            querybudget.check(make_request(RECIPE_URL), log)
+
+    def test_over_budget_logged(self):
+        log = make_log(*(f'SELECT {i}' for i in range(6)))
+
+        with override_settings(QUERY_BUDGET={**QUERY_BUDGET, 'RAISE': False}):
+            with self.assertLogs('core.querybudget', 'WARNING') as logs:
+                querybudget.check(make_request(RECIPE_URL), log)
+
+        self.assertIn('over its query budget', logs.output[0])
+
+    def test_action_without_budget(self):
+        log = make_log(*(f'SELECT {i}' for i in range(20)))
+
+        querybudget.check(make_request(RECIPE_URL, 'post'), log)
+
+    def test_repeated_shape_on_constant_view(self):
+        log = make_log(
+            'SELECT a',
+            'SELECT b WHERE id = %s',
+            'SELECT b WHERE id = %s',
+        )
+
+        with self.assertRaisesMessage(
+            querybudget.QueryBudgetExceeded,
+            'the count grows with the results',
+        ):
+            querybudget.check(make_request(TAG_URL), log)
+
+    def test_repeated_shape_logged_with_stack(self):
+        log = make_log(*['SELECT b WHERE id = %s'] * 3)
+
+        with override_settings(QUERY_BUDGET={**QUERY_BUDGET, 'RAISE': False}):
+            with self.assertLogs('core.querybudget', 'WARNING') as logs:
+                querybudget.check(make_request(reverse('user:me')), log)
+
+        self.assertIn('Query run 3 times', logs.output[0])
+        self.assertIn('test_querybudget.py', logs.output[0])
+
+
+@override_settings(QUERY_BUDGET=QUERY_BUDGET, RECIPE_CACHE_TIMEOUT=0)
+class QueryBudgetApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'userpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            recipe.tags.add(tag)
+
+    def test_list_within_budget(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_per_row_query_detected(self):
+        def get_image_variants(serializer, obj):
+            return {'tagged': Tag.objects.filter(recipe=obj).exists()}
+
+        with patch.object(
+            RecipeSerializer,
+            'get_image_variants',
+            get_image_variants,
+        ), self.assertLogs('core.querybudget', 'WARNING') as logs:
+            with self.assertRaises(querybudget.QueryBudgetExceeded) as cm:
+                self.client.get(RECIPE_URL)
+
+        self.assertIn('Query run 10 times', logs.output[0])
+        self.assertIn('get_image_variants', str(cm.exception))
+
+    def test_disabled(self):
+        config = {**QUERY_BUDGET, 'ENABLED': False}
+        with override_settings(QUERY_BUDGET=config), patch(
+            'core.querybudget.check',
+        ) as check:
+            self.client.get(RECIPE_URL)
+
+        check.assert_not_called()
+
+
+class SlowQueryTests(TestCase):
+
+    def test_slow_query_explained(self):
+        config = {**QUERY_BUDGET, 'SLOW_QUERY_MS': 10, 'EXPLAIN': True}
+
+        with override_settings(QUERY_BUDGET=config):
+            with self.assertLogs('core.querybudget', 'WARNING') as logs:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_sleep(%s)', [0.02])
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Slow query', logs.output[0])
+        self.assertIn('Result', logs.output[0])
+
+    def test_fast_query_not_logged(self):
+        config = {**QUERY_BUDGET, 'SLOW_QUERY_MS': 1000}
+
+        with override_settings(QUERY_BUDGET=config), patch(
+            'core.querybudget._log_slow_query',
+        ) as log_slow_query:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        log_slow_query.assert_not_called()
+
+
+@override_settings(
+    QUERY_BUDGET=QUERY_BUDGET,
+    MIDDLEWARE=['core.middleware.QueryBudgetMiddleware'],
+    ROOT_URLCONF='core.tests.test_instrumentation',
+)
+class QueryBudgetAsyncTests(SimpleTestCase):
+
+    async def test_concurrent_requests_overlap(self):
+        with patch('core.querybudget.check') as check:
+            most, responses = await get_concurrently(3)
+
+        self.assertEqual(most, 3)
+        self.assertEqual(check.call_count, 3)
+        for res in responses:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,64 @@
+"""
+tests for the read replica router
+"""
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core import routers
+from core.models import Recipe
+
+REPLICATION = {
+    'REPLICAS': ['replica_1', 'replica_2'],
+    'PIN_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
+}
+
+
+@override_settings(DATABASE_REPLICATION=REPLICATION)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        cache.clear()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_use_replica_when_enabled(self):
+        with routers.replica_reads():
+            alias = self.router.db_for_read(Recipe)
+
+        self.assertIn(alias, REPLICATION['REPLICAS'])
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_writes_use_primary(self):
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    @override_settings(DATABASE_REPLICATION={
+        **REPLICATION, 'REPLICAS': [],
+    })
+    def test_without_replicas(self):
+        routers.pin_to_primary(1)
+
+        with routers.replica_reads():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+        self.assertFalse(routers.is_pinned(1))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+
+    def test_pin_to_primary(self):
+        routers.pin_to_primary(1)
+
+        self.assertTrue(routers.is_pinned(1))
+        self.assertFalse(routers.is_pinned(2))
+
+    @override_settings(DATABASE_REPLICATION={
+        **REPLICATION, 'PIN_SECONDS': 0,
+    })
+    def test_pin_disabled(self):
+        routers.pin_to_primary(1)
+
+        self.assertFalse(routers.is_pinned(1))
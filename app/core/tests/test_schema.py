@@ -0,0 +1,125 @@
+"""
+Docstring for app.core.tests.test_schema
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+DOCS_URL = reverse('api-docs')
+
+
+class SchemaTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        settings = override_settings(
+            SCHEMA_CACHE={'VERSION': 'test', 'DIR': self.dir},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+    def test_schema_has_etag(self):
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], schema.FORMATS['yaml'])
+        self.assertIn(b'/api/recipe/recipes/', res.content)
+        self.assertIn('ETag', res)
+
+    def test_schema_not_modified(self):
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_schema_json(self):
+        res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(res['Content-Type'], schema.FORMATS['json'])
+        self.assertIn('openapi', res.json())
+
+    def test_schema_has_annotations(self):
+        res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        operation = res.json()['paths']['/api/recipe/recipes/']['get']
+        self.assertIn(
+            'ordering',
+            [parameter['name'] for parameter in operation['parameters']],
+        )
+
+    def test_urls_do_not_import_drf_spectacular(self):
+        code = (
+            'import sys, django; django.setup(); import recipe.urls; '
+            "print('drf_spectacular.openapi' in sys.modules)"
+        )
+
+        out = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'app.settings'},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+
+        self.assertEqual(out.strip(), 'False')
+
+    def test_schema_generated_once(self):
+        self.client.get(SCHEMA_URL)
+
+        with patch('core.schema.generate') as generate:
+            res = self.client.get(SCHEMA_URL)
+            schema.clear()
+            self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        generate.assert_not_called()
+        self.assertTrue(
+            os.path.exists(os.path.join(self.dir, 'schema-test.yaml')),
+        )
+
+    def test_new_version_regenerates(self):
+        self.client.get(SCHEMA_URL)
+        schema.clear()
+
+        with override_settings(
+            SCHEMA_CACHE={'VERSION': 'next', 'DIR': self.dir},
+        ), patch('core.schema.generate', return_value=b'openapi: 3.0.3'):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.content, b'openapi: 3.0.3')
+
+    def test_generate_schema_command(self):
+        out = StringIO()
+
+        call_command('generate_schema', stdout=out)
+
+        for fmt in schema.FORMATS:
+            self.assertTrue(
+                os.path.exists(os.path.join(self.dir, f'schema-test.{fmt}')),
+            )
+        with patch('core.schema.generate') as generate:
+            call_command('generate_schema', stdout=StringIO())
+        generate.assert_not_called()
+
+    def test_docs(self):
+        res = self.client.get(DOCS_URL)
+
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,160 @@
+"""
+tests for content addressed storage
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import MediaBlob, Recipe
+from core.storage import ContentAddressedStorage, update_references
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = Recipe._meta.get_field('image').storage
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+    def test_save_names_file_by_content(self):
+        content = b'image bytes'
+        digest = hashlib.sha256(content).hexdigest()
+
+        save = self.storage.save
+        first = save('uploads/recipe/a.JPG', ContentFile(content))
+        second = save('uploads/recipe/b.jpg', ContentFile(content))
+
+        self.assertIsInstance(self.storage, ContentAddressedStorage)
+        self.assertEqual(first, f'uploads/recipe/{digest}.jpg')
+        self.assertEqual(second, first)
+        self.assertEqual(os.listdir(self.storage.path('uploads/recipe')), [
+            f'{digest}.jpg',
+        ])
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.name, blob.size), (first, len(content)))
+
+    def test_save_touches_existing_blob(self):
+        name = self.storage.save('blob.txt', ContentFile(b'data'))
+        old = timezone.now() - timedelta(days=1)
+        MediaBlob.objects.filter(name=name).update(touched_at=old)
+
+        self.storage.save('blob.txt', ContentFile(b'data'))
+
+        self.assertGreater(MediaBlob.objects.get(name=name).touched_at, old)
+
+    def test_update_references(self):
+        a = MediaBlob.objects.create(name='a', ref_count=1)
+        b = MediaBlob.objects.create(name='b', ref_count=1)
+
+        update_references(added=['a', 'a', 'b'], removed=['b', 'b'])
+
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual((a.ref_count, b.ref_count), (3, 0))
+
+    def test_recipe_delete_releases_references(self):
+        user = get_user_model().objects.create_user('user@example.com', 'x')
+        MediaBlob.objects.create(name='image.jpg', ref_count=2)
+        MediaBlob.objects.create(name='thumb.webp', ref_count=1)
+        recipe = Recipe.objects.create(
+            user=user,
+            title='recipe',
+            time_minutes=5,
+            price=Decimal('1.00'),
+            image='image.jpg',
+            image_variants={'thumbnail': {'webp': 'thumb.webp'}},
+        )
+
+        recipe.delete()
+
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('name', 'ref_count')),
+            {'image.jpg': 1, 'thumb.webp': 0},
+        )
+
+
+class GCMediaCommandTests(MediaRootMixin, TestCase):
+    def _blob(self, content, ref_count=0, age=timedelta(days=1)):
+        name = self.storage.save('blob.txt', ContentFile(content))
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=ref_count,
+            touched_at=timezone.now() - age,
+        )
+        return name
+
+    def _gc(self, *args):
+        call_command('gc_media', *args, stdout=StringIO())
+
+    def test_deletes_unreferenced_blobs_in_batches(self):
+        orphans = [self._blob(f'orphan {i}'.encode()) for i in range(3)]
+        used = self._blob(b'used', ref_count=1)
+        recent = self._blob(b'recent', age=timedelta(0))
+
+        self._gc('--batch-size', '2')
+
+        for name in orphans:
+            self.assertFalse(self.storage.exists(name))
+        self.assertEqual(
+            set(MediaBlob.objects.values_list('name', flat=True)),
+            {used, recent},
+        )
+        self.assertTrue(self.storage.exists(used))
+        self.assertTrue(self.storage.exists(recent))
+
+    def test_dry_run_keeps_blobs(self):
+        name = self._blob(b'orphan')
+
+        self._gc('--dry-run')
+
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+
+    def test_recount(self):
+        user = get_user_model().objects.create_user('user@example.com', 'x')
+        stale = self._blob(b'stale', ref_count=3)
+        image = self._blob(b'image', ref_count=0)
+        # Written before the blob table existed, under a uuid name.
+        legacy = 'uploads/recipe/legacy.jpg'
+        os.makedirs(self.storage.path('uploads/recipe'))
+        with open(self.storage.path(legacy), 'wb') as f:
+            f.write(b'legacy')
+        for name in (image, image):
+            Recipe.objects.create(
+                user=user,
+                title='recipe',
+                time_minutes=5,
+                price=Decimal('1.00'),
+                image=name,
+            )
+        Recipe.objects.create(
+            user=user,
+            title='legacy',
+            time_minutes=5,
+            price=Decimal('1.00'),
+            image=legacy,
+        )
+
+        self._gc('--recount', '--grace', '0')
+
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('name', 'ref_count')),
+            {image: 2, legacy: 1},
+        )
+        self.assertEqual(MediaBlob.objects.get(name=legacy).size, 6)
+        self.assertFalse(self.storage.exists(stale))
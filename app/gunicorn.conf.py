@@ -0,0 +1,94 @@
+"""
+gunicorn settings of the production server, see scripts/run.sh
+
+Every value can be overridden from the environment. The default worker
+is gthread serving app.wsgi. GUNICORN_WORKER_CLASS=uvicorn runs uvicorn
+workers serving app.asgi instead, one event loop per CPU.
+"""
+
+import os
+
+WORKER_CLASSES = {
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+
+def _cpu_count():
+    # The CPUs the container may use, not every CPU of the host.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+_cpus = _cpu_count()
+_worker = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+_asgi = _worker == 'uvicorn'
+
+worker_class = WORKER_CLASSES[_worker]
+wsgi_app = 'app.asgi:application' if _asgi else 'app.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Threads of a gthread worker wait on the database, so there are more
+# workers than CPUs. An event loop keeps one CPU busy on its own.
+workers = _env_int('GUNICORN_WORKERS', _cpus if _asgi else 2 * _cpus + 1)
+threads = _env_int('GUNICORN_THREADS', 4)
+
+# Import the app once in the master, the workers share its memory pages
+# copy on write instead of each importing Django.
+preload_app = bool(_env_int('GUNICORN_PRELOAD', 1))
+
+# Restart a worker after about this many requests, jittered so they
+# don't all restart at once, to bound memory growth. 0 disables.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    # Outside DEBUG Django answers 400 DisallowedHost to every request
+    # when ALLOWED_HOSTS is empty, better not to start at all.
+    debug = bool(int(os.environ.get('DEBUG', 0)))
+    if not debug and not os.environ.get('ALLOWED_HOSTS', '').strip(' ,'):
+        raise SystemExit(
+            'ALLOWED_HOSTS is empty: set it to the host names the app is '
+            'served on, comma separated (or DEBUG=1 for development).'
+        )
+
+
+def pre_fork(server, worker):
+    # A socket opened while preloading would be shared by every worker.
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+    from core.backends.postgresql_pool.base import close_pools
+
+    connections.close_all()
+    close_pools()
+
+
+def post_worker_init(worker):
+    # Open the MIN_SIZE connections of the pooled backend before the
+    # first request rather than during it.
+    from django.db import connections
+
+    connection = connections['default']
+    if hasattr(connection, 'get_pool'):
+        connection.get_pool()
+
+
+def worker_exit(server, worker):
+    from core import concurrency
+
+    concurrency.shutdown()
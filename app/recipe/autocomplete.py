@@ -0,0 +1,55 @@
+"""
+Trigram autocomplete of tag and ingrediant names, prefix without pg_trgm
+"""
+
+from django.db import connections
+from django.db.models import CharField, FloatField, Func, Value
+from django.db.models.lookups import PostgresOperatorLookup
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+_has_trigram = {}
+
+
+# Backport of the Django 4.0 lookup and function, they match a query
+# against any part of the name, which is what type-ahead needs.
+@CharField.register_lookup
+class TrigramWordSimilar(PostgresOperatorLookup):
+    lookup_name = 'trigram_word_similar'
+    postgres_operator = '%%>'
+
+
+class TrigramWordSimilarity(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+    def __init__(self, string, expression, **extra):
+        if not hasattr(string, 'resolve_expression'):
+            string = Value(string)
+        super().__init__(string, expression, **extra)
+
+
+def has_trigram(using='default'):
+    """Whether pg_trgm is installed, checked once per process."""
+    if using not in _has_trigram:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _has_trigram[using] = cursor.fetchone() is not None
+    return _has_trigram[using]
+
+
+def complete(queryset, text, limit=DEFAULT_LIMIT):
+    """Best matching names first, fuzzy where pg_trgm is available.
+
+    Without it, fall back to a case insensitive prefix match.
+    """
+    if has_trigram(queryset.db):
+        return queryset.filter(
+            name__trigram_word_similar=text,
+        ).annotate(
+            similarity=TrigramWordSimilarity(text, 'name'),
+        ).order_by('-similarity', 'name')[:limit]
+    return queryset.filter(name__istartswith=text).order_by('name')[:limit]
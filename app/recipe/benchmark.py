@@ -0,0 +1,124 @@
+"""
+Seed recipes and time the list queries for the benchmark command
+"""
+
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core.models import Recipe, Tag, Ingrediant
+from recipe.search import update_search_vectors
+from recipe.usage import RELATED_FIELDS, recount
+
+WORDS = (
+    'chicken beef pork tofu salmon shrimp lentil bean rice pasta noodle '
+    'potato tomato onion garlic ginger lemon lime basil thyme rosemary '
+    'curry soup stew salad roast grilled baked fried spicy smoky sweet '
+    'sour creamy crispy quick easy vegan summer winter classic rustic '
+    'apple cherry chocolate vanilla honey maple butter cheese mushroom'
+).split()
+TAG_COUNT = 40
+INGREDIANT_COUNT = 200
+MAX_LINKS = 5
+
+
+def get_user(email):
+    users = get_user_model().objects
+    return users.filter(email=email).first() or users.create_user(email)
+
+
+def _attrs(model, user, names):
+    model.objects.bulk_create(
+        [model(user=user, name=name) for name in names],
+        ignore_conflicts=True,
+    )
+    return list(model.objects.filter(user=user, name__in=names))
+
+
+def seed_recipes(user, total, batch_size, stdout=None):
+    """Bulk insert `total` random recipes with tags and ingrediants.
+
+    Tags are skewed, so filters hit both common and rare ones.
+    """
+    rng = random.Random(total)
+    tags = _attrs(Tag, user, WORDS[:TAG_COUNT])
+    ingrediants = _attrs(Ingrediant, user, [
+        f'{WORDS[i % len(WORDS)]} {i}' for i in range(INGREDIANT_COUNT)
+    ])
+    tag_weights = [1 / (rank + 1) for rank in range(len(tags))]
+    created = 0
+    while created < total:
+        size = min(batch_size, total - created)
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=' '.join(rng.sample(WORDS, 3)),
+                    description=' '.join(rng.choices(WORDS, k=12)),
+                    time_minutes=rng.randint(5, 180),
+                    price=rng.randint(100, 5000) / 100,
+                )
+                for _ in range(size)
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in recipes
+                for tag in {
+                    *rng.choices(
+                        tags,
+                        tag_weights,
+                        k=rng.randint(0, MAX_LINKS),
+                    )
+                }
+            ])
+            Recipe.ingrediants.through.objects.bulk_create([
+                Recipe.ingrediants.through(
+                    recipe_id=recipe.id,
+                    ingrediant_id=ingrediant.id,
+                )
+                for recipe in recipes
+                for ingrediant in rng.sample(
+                    ingrediants,
+                    rng.randint(1, MAX_LINKS),
+                )
+            ])
+            update_search_vectors([recipe.id for recipe in recipes])
+        created += size
+        if stdout is not None:
+            stdout.write(f'seeded {created}/{total} recipes')
+
+    for model in RELATED_FIELDS:
+        recount(model, model.objects.filter(user=user).values('pk'))
+    with connection.cursor() as cursor:
+        for model in (Recipe, Recipe.tags.through, Recipe.ingrediants.through):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def prepare(email, total, batch_size, stdout=None):
+    """The benchmark user, topped up to `total` recipes."""
+    user = get_user(email)
+    missing = total - Recipe.objects.filter(user=user).count()
+    if missing > 0:
+        seed_recipes(user, missing, batch_size, stdout)
+    return user
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return (
+        f'p50 {statistics.median(timings):.1f}ms '
+        f'p95 {p95:.1f}ms max {timings[-1]:.1f}ms'
+    )
@@ -0,0 +1,117 @@
+"""
+Bulk recipe import, validated and saved in chunks
+"""
+
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.settings import api_settings
+
+from core.models import Recipe, Tag, Ingrediant
+from recipe.parsers import InvalidLine
+from recipe.search import update_search_vectors
+from recipe.usage import adjust_recipe_counts
+from recipe.serializers import (
+    RecipeDetailSerializer,
+    get_or_create_by_name,
+)
+
+CHUNK_SIZE = 500
+
+
+def iter_chunks(items, size):
+    items = iter(items)
+    chunk = list(islice(items, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, size))
+
+
+def import_recipes(user, items, context, chunk_size=None):
+    """Validate and insert recipes chunk by chunk, one transaction each."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    results = []
+    for offset, chunk in enumerate(iter_chunks(items, chunk_size)):
+        results.extend(
+            _import_chunk(user, chunk, offset * chunk_size, context)
+        )
+    return results
+
+
+def _import_chunk(user, chunk, start, context):
+    results = []
+    valid = []
+    for index, item in enumerate(chunk, start=start):
+        if isinstance(item, InvalidLine):
+            results.append({
+                'index': index,
+                'status': 'invalid',
+                'errors': {api_settings.NON_FIELD_ERRORS_KEY: [item.message]},
+            })
+            continue
+        serializer = RecipeDetailSerializer(data=item, context=context)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results.append({
+                'index': index,
+                'status': 'invalid',
+                'errors': serializer.errors,
+            })
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        tags = _resolve_names(Tag, user, valid, 'tags')
+        ingrediants = _resolve_names(Ingrediant, user, valid, 'ingrediants')
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                **{
+                    field: value for field, value in data.items()
+                    if field not in ('tags', 'ingrediants')
+                }
+            )
+            for index, data in valid
+        ])
+        _link(Recipe.tags.through, 'tag_id', recipes, valid, 'tags', tags)
+        _link(
+            Recipe.ingrediants.through,
+            'ingrediant_id',
+            recipes,
+            valid,
+            'ingrediants',
+            ingrediants,
+        )
+        # bulk_create and the through rows skip the signals.
+        update_search_vectors([recipe.id for recipe in recipes])
+
+    for (index, data), recipe in zip(valid, recipes):
+        results.append({'index': index, 'status': 'created', 'id': recipe.id})
+    return sorted(results, key=lambda result: result['index'])
+
+
+def _resolve_names(model, user, valid, field):
+    names = [
+        item['name'] for index, data in valid for item in data.get(field, [])
+    ]
+    return {
+        obj.name: obj for obj in get_or_create_by_name(model, user, names)
+    }
+
+
+def _link(through, fk_name, recipes, valid, field, objs_by_name):
+    rows = []
+    for recipe, (index, data) in zip(recipes, valid):
+        names = dict.fromkeys(item['name'] for item in data.get(field, []))
+        rows.extend(
+            through(recipe_id=recipe.id, **{fk_name: objs_by_name[name].id})
+            for name in names
+        )
+    through.objects.bulk_create(rows)
+    # bulk_create sends no m2m_changed, count the new links here.
+    adjust_recipe_counts(
+        through._meta.get_field(fk_name).related_model,
+        Counter(getattr(row, fk_name) for row in rows),
+    )
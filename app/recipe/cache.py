@@ -0,0 +1,85 @@
+"""
+Per user response cache invalidated by a write generation
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = 'recipe:generation:{user_id}'
+RESPONSE_KEY = 'recipe:response:{user_id}:{generation}:{view}:{digest}'
+
+_metrics = {'hits': 0, 'misses': 0}
+_metrics_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _new_generation():
+    # Time based, so a counter lost to eviction never reuses an old value
+    # and conditional GETs can use it as the time of the last write.
+    return time.time_ns()
+
+
+def _record(name):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def get_metrics():
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def is_enabled():
+    return settings.RECIPE_CACHE_TIMEOUT > 0
+
+
+def get_generation(user_id):
+    key = GENERATION_KEY.format(user_id=user_id)
+    return _cache().get_or_set(key, _new_generation, timeout=None)
+
+
+def bump_generation(user_id):
+    """Invalidate every cached response of the user."""
+    key = GENERATION_KEY.format(user_id=user_id)
+    _cache().set(key, _new_generation(), timeout=None)
+
+
+def normalize_params(params):
+    return sorted(
+        (name, value)
+        for name, values in params.lists()
+        for value in values
+    )
+
+
+def response_key(user_id, view, params):
+    normalized = normalize_params(params)
+    digest = hashlib.sha1(repr(normalized).encode()).hexdigest()
+    return RESPONSE_KEY.format(
+        user_id=user_id,
+        generation=get_generation(user_id),
+        view=view,
+        digest=digest,
+    )
+
+
+def get_response(key):
+    """Return a cached `(data, headers)` pair or None."""
+    cached = _cache().get(key)
+    _record('misses' if cached is None else 'hits')
+    return cached
+
+
+def set_response(key, data, headers=None):
+    _cache().set(
+        key,
+        (data, headers or {}),
+        timeout=settings.RECIPE_CACHE_TIMEOUT,
+    )
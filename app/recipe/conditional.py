@@ -0,0 +1,52 @@
+"""
+ETag and Last-Modified validators for conditional GETs
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.http import parse_etags, parse_http_date_safe
+
+from recipe.cache import normalize_params
+
+
+def make_validators(view, stats, generation, params):
+    """Build a weak ETag and Last-Modified from aggregate stats.
+
+    The per-user cache generation is part of both, so changes that do not
+    touch `updated_at` (deletes, related renames) still change them.
+    """
+    last_modified = stats['last_modified']
+    digest = hashlib.sha1(repr((
+        view,
+        stats['count'],
+        last_modified.isoformat() if last_modified else None,
+        generation,
+        normalize_params(params),
+    )).encode()).hexdigest()
+
+    generated_at = datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)
+    if last_modified is None or generated_at > last_modified:
+        last_modified = generated_at
+    return f'W/"{digest}"', last_modified
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def is_not_modified(request, etag, last_modified):
+    """Check the request preconditions, `last_modified` in epoch seconds."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or _opaque(etag) in map(_opaque, etags)
+
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE')
+    )
+    return (
+        if_modified_since is not None
+        and last_modified is not None
+        and last_modified <= if_modified_since
+    )
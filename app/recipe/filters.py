@@ -0,0 +1,55 @@
+"""
+Tag and ingrediant filters and the orderings of the recipe list
+"""
+
+from django.db.models import Count, Exists, OuterRef
+
+from recipe.usage import through_of
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+# Above this many ids `all` groups the links once instead of probing
+# the through table per id for every candidate recipe.
+EXISTS_ALL_LIMIT = 3
+
+# `ordering` values of the recipe list, each with `id` as tie breaker so
+# the (user, column, id) indexes serve it and cursors stay stable.
+ORDERING_COLUMNS = ('id', 'title', 'time_minutes', 'price')
+ORDERINGS = ORDERING_COLUMNS + tuple(f'-{name}' for name in ORDERING_COLUMNS)
+DEFAULT_ORDERING = '-id'
+
+
+def filter_related(queryset, model, ids, match=MATCH_ANY):
+    """Recipes linked to any or all of the `model` rows in `ids`.
+
+    Neither mode joins the through table into the outer query, so no
+    DISTINCT is needed. `any` is an EXISTS semi-join. `all` is one
+    EXISTS per id for small sets, otherwise the recipes with a link to
+    every id, grouped with HAVING COUNT over the (tag_id, recipe_id)
+    index.
+    """
+    ids = set(ids)
+    through, column = through_of(model)
+    if match == MATCH_ALL and len(ids) <= EXISTS_ALL_LIMIT:
+        for pk in ids:
+            queryset = queryset.filter(Exists(through.objects.filter(
+                recipe_id=OuterRef('pk'), **{column: pk},
+            )))
+        return queryset
+    links = through.objects.filter(**{f'{column}__in': ids})
+    if match == MATCH_ALL:
+        recipe_ids = links.order_by().values('recipe_id').annotate(
+            total=Count('*'),
+        ).filter(total=len(ids)).values('recipe_id')
+        return queryset.filter(pk__in=recipe_ids)
+    return queryset.filter(Exists(links.filter(recipe_id=OuterRef('pk'))))
+
+
+def ordering_fields(ordering=DEFAULT_ORDERING):
+    """`order_by` arguments for an `ordering` value."""
+    prefix = '-' if ordering.startswith('-') else ''
+    column = ordering.lstrip('-')
+    if column == 'id':
+        return (ordering,)
+    return (ordering, f'{prefix}id')
@@ -0,0 +1,156 @@
+"""
+Resized image variants, made off the request thread
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from core.storage import update_references
+from recipe import cache
+
+logger = logging.getLogger(__name__)
+
+# Extension -> Pillow format of every variant that is written.
+VARIANT_FORMATS = {
+    'webp': 'WEBP',
+    'jpg': 'JPEG',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PROCESSING['WORKERS'],
+                    thread_name_prefix='recipe-images',
+                )
+    return _executor
+
+
+def enqueue(recipe_id):
+    """Generate the variants of the recipe once the upload is committed."""
+    if settings.IMAGE_PROCESSING['EAGER']:
+        transaction.on_commit(lambda: process_recipe_image(recipe_id))
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(_run, recipe_id)
+        )
+
+
+def _run(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Processing image of recipe %s failed', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def _render(image, size, fmt):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    if variant.mode not in ('RGB', 'L'):
+        variant = variant.convert('RGB')
+    buffer = io.BytesIO()
+    # No exif/icc arguments, so the metadata of the original is dropped.
+    variant.save(
+        buffer,
+        fmt,
+        quality=settings.IMAGE_PROCESSING['QUALITY'],
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def create_variants(field):
+    """Write every configured variant next to the original image.
+
+    Returns a `{label: {extension: name}}` map of the stored files.
+    """
+    with field.open('rb') as f:
+        image = Image.open(f)
+        image.load()
+    # Apply the EXIF orientation before the metadata is thrown away.
+    image = ImageOps.exif_transpose(image)
+
+    base, _ = os.path.splitext(field.name)
+    variants = {}
+    for label, size in settings.IMAGE_PROCESSING['VARIANTS'].items():
+        for ext, fmt in VARIANT_FORMATS.items():
+            name = field.storage.save(
+                f'{base}_{label}.{ext}',
+                _render(image, size, fmt),
+            )
+            variants.setdefault(label, {})[ext] = name
+    return variants
+
+
+def process_recipe_image(recipe_id):
+    try:
+        recipe = Recipe.objects.only('id', 'user_id', 'image').get(
+            pk=recipe_id,
+        )
+    except Recipe.DoesNotExist:
+        return
+    if not recipe.image:
+        return
+
+    # Identical uploads share the stored image, and so its variants.
+    variants = Recipe.objects.filter(
+        image=recipe.image.name,
+        image_status=Recipe.IMAGE_READY,
+    ).exclude(pk=recipe.pk).values_list('image_variants', flat=True).first()
+    image_status = Recipe.IMAGE_READY
+    if variants is None:
+        try:
+            variants = create_variants(recipe.image)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.exception('Cannot create variants of %s', recipe.image.name)
+            variants = {}
+            image_status = Recipe.IMAGE_FAILED
+
+    with transaction.atomic():
+        # Filtering on the image skips the write when a newer upload
+        # replaced it in the meantime, that one has its own job queued.
+        updated = Recipe.objects.filter(
+            pk=recipe.pk,
+            image=recipe.image.name,
+        ).update(
+            image_status=image_status,
+            image_variants=variants,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            update_references(added=[
+                name for names in variants.values() for name in names.values()
+            ])
+    cache.bump_generation(recipe.user_id)
+
+
+def stale_pending(seconds):
+    """Recipes pending for longer than `seconds`.
+
+    Their job was most likely lost with the worker that queued it, when
+    gunicorn recycled or killed it, since jobs only live in memory.
+    """
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    return Recipe.objects.filter(
+        image_status=Recipe.IMAGE_PENDING,
+        updated_at__lt=cutoff,
+    ).exclude(image='')
@@ -0,0 +1,86 @@
+"""
+django command to benchmark tag filtering of the recipe list
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe, Tag
+from recipe import filters
+from recipe.benchmark import measure, prepare, summary
+from recipe.pagination import RecipePageNumberPagination
+
+DEFAULT_SIZES = [1, 3, 10, 20]
+
+
+class Command(BaseCommand):
+    help = 'Seed recipes for a benchmark user and time tag filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--email', default='search-bench@example.com')
+        parser.add_argument(
+            '--tags',
+            type=int,
+            action='append',
+            dest='sizes',
+            help='Number of tag ids to filter by, can be repeated.',
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Also time the old join with DISTINCT.',
+        )
+        parser.add_argument('--explain', action='store_true')
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the benchmark user and its recipes afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        user = prepare(
+            options['email'],
+            options['recipes'],
+            options['batch_size'],
+            self.stdout,
+        )
+        recipes = Recipe.objects.filter(user=user).order_by('-id')
+        # Most used first, so small sets match many recipes.
+        tag_ids = list(Tag.objects.filter(user=user).order_by(
+            '-recipe_count', 'id',
+        ).values_list('id', flat=True))
+
+        variants = {
+            mode: lambda ids, mode=mode: filters.filter_related(
+                recipes, Tag, ids, mode,
+            )
+            for mode in filters.MATCH_MODES
+        }
+        if options['legacy']:
+            variants['legacy'] = lambda ids: recipes.filter(
+                tags__id__in=ids,
+            ).distinct()
+
+        page_size = RecipePageNumberPagination.page_size
+        for size in options['sizes'] or DEFAULT_SIZES:
+            ids = tag_ids[:size]
+            for name, build in variants.items():
+                queryset = build(ids)
+                page = queryset.values_list('id', flat=True)[:page_size]
+                page_times = measure(
+                    lambda: list(page.all()),
+                    options['repeat'],
+                )
+                count_times = measure(queryset.count, options['repeat'])
+                self.stdout.write(
+                    f'{len(ids)} tags {name}: {queryset.count()} matches, '
+                    f'page {summary(page_times)}, '
+                    f'count {summary(count_times)}'
+                )
+                if options['explain']:
+                    self.stdout.write(page.explain(analyze=True))
+
+        if options['cleanup']:
+            user.delete()
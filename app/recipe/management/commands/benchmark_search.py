@@ -0,0 +1,60 @@
+"""
+django command to benchmark ranked recipe search
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe import search
+from recipe.benchmark import measure, prepare, summary
+from recipe.pagination import RecipePageNumberPagination
+
+DEFAULT_QUERIES = ['chicken', 'spicy curry', '"lemon garlic" -fried', 'vegan']
+
+
+class Command(BaseCommand):
+    help = 'Seed recipes for a benchmark user and time ranked searches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--email', default='search-bench@example.com')
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Search to time, can be repeated.',
+        )
+        parser.add_argument('--explain', action='store_true')
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the benchmark user and its recipes afterwards.',
+        )
+
+    def handle(self, *args, **options):
+        user = prepare(
+            options['email'],
+            options['recipes'],
+            options['batch_size'],
+            self.stdout,
+        )
+        recipes = Recipe.objects.filter(user=user)
+
+        page_size = RecipePageNumberPagination.page_size
+        for text in options['queries'] or DEFAULT_QUERIES:
+            queryset = search.rank(search.search(recipes, text), text)
+            page = queryset.values_list('id', 'rank', 'headline')[:page_size]
+            page_times = measure(lambda: list(page.all()), options['repeat'])
+            count_times = measure(queryset.count, options['repeat'])
+            self.stdout.write(
+                f'{text!r}: {queryset.count()} matches, '
+                f'page {summary(page_times)}, '
+                f'count {summary(count_times)}'
+            )
+            if options['explain']:
+                self.stdout.write(page.explain(analyze=True))
+
+        if options['cleanup']:
+            user.delete()
@@ -0,0 +1,127 @@
+"""
+django command to load test the sync and async recipe list
+
+Start the two servers first, with the same number of workers, e.g.
+
+    gunicorn app.wsgi -w 1 --threads 8 -b 127.0.0.1:8000
+    uvicorn app.asgi:application --workers 1 --port 8001
+
+then compare them with
+
+    python manage.py loadtest --wsgi-url http://127.0.0.1:8000 \\
+        --asgi-url http://127.0.0.1:8001 --concurrency 200
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from recipe.benchmark import prepare, summary
+
+
+async def fetch(url, headers, slow_read):
+    """GET `url`, reading the response `slow_read` seconds per 4KB."""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(
+        parts.hostname,
+        parts.port or 80,
+    )
+    try:
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        lines = [
+            f'GET {path} HTTP/1.1',
+            f'Host: {parts.netloc}',
+            'Connection: close',
+            *(f'{name}: {value}' for name, value in headers.items()),
+        ]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        while await reader.read(4096):
+            if slow_read:
+                await asyncio.sleep(slow_read)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run(url, headers, total, concurrency, slow_read):
+    """Latencies in ms and the non 200 statuses of `total` requests."""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    errors = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status = await fetch(url, headers, slow_read)
+            except OSError as exc:
+                status = type(exc).__name__
+            timings.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return timings, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Compare the recipe list served by WSGI and by the async view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help='Base URL of a WSGI server.')
+        parser.add_argument('--asgi-url', help='Base URL of an ASGI server.')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument(
+            '--slow-read',
+            type=float,
+            default=0,
+            help='Seconds a client pauses per 4KB read, for slow clients.',
+        )
+        parser.add_argument('--query', default='page_size=50')
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--email', default='load-test@example.com')
+
+    def handle(self, *args, **options):
+        targets = [
+            (name, base, reverse(url_name))
+            for name, base, url_name in (
+                ('wsgi', options['wsgi_url'], 'recipe:recipe-list'),
+                ('asgi', options['asgi_url'], 'recipe:async-recipe-list'),
+            )
+            if base
+        ]
+        if not targets:
+            raise CommandError('Pass --wsgi-url and/or --asgi-url.')
+
+        user = prepare(
+            options['email'],
+            options['recipes'],
+            options['batch_size'],
+            self.stdout,
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+
+        for name, base, path in targets:
+            url = f'{base.rstrip("/")}{path}?{options["query"]}'
+            timings, errors, elapsed = asyncio.run(run(
+                url,
+                headers,
+                options['requests'],
+                options['concurrency'],
+                options['slow_read'],
+            ))
+            self.stdout.write(
+                f'{name}: {len(timings) / elapsed:.0f} req/s, '
+                f'{summary(timings)}, {len(errors)} errors'
+                + (f' ({sorted(set(map(str, errors)))})' if errors else '')
+            )
@@ -0,0 +1,35 @@
+"""
+django command to redo the image variant jobs that were lost
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipe.images import process_recipe_image, stale_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the variants of recipes whose image stayed pending, run '
+        'it at start up and periodically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.IMAGE_PROCESSING['STALE_SECONDS'],
+            help='Only recipes pending for at least this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        ids = list(
+            stale_pending(options['older_than'])
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        for recipe_id in ids:
+            process_recipe_image(recipe_id)
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {len(ids)} pending images')
+        )
@@ -0,0 +1,35 @@
+"""
+django command to recompute Tag/Ingrediant.recipe_count
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.usage import RELATED_FIELDS, recount
+
+
+class Command(BaseCommand):
+    help = 'Recompute recipe_count of tags and ingrediants in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in RELATED_FIELDS:
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+            last_pk = 0
+            total = 0
+            while True:
+                batch = list(pks.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                # Short transactions, so writers are only held up briefly.
+                with transaction.atomic():
+                    recount(model, batch)
+                last_pk = batch[-1]
+                total += len(batch)
+            self.stdout.write(
+                f'Recounted {total} {model._meta.verbose_name_plural}'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
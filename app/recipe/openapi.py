@@ -0,0 +1,136 @@
+"""
+OpenAPI annotations of the recipe API, applied only when a schema is made
+
+core.schema imports the `openapi` module of each app before generating,
+so workers serving requests never import drf_spectacular.
+"""
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_field,
+    extend_schema_view,
+    OpenApiParameter,
+)
+
+from recipe import autocomplete as completion
+from recipe import filters
+from recipe import serializers
+from recipe import views
+
+RECIPE_QUERY_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma sepearted list of tag ids to filter',
+    ),
+    OpenApiParameter(
+        'ingrediants',
+        OpenApiTypes.STR,
+        description='Comma sepearted list of ingrediants ids to filter',
+    ),
+    OpenApiParameter(
+        'match',
+        OpenApiTypes.STR, enum=list(filters.MATCH_MODES),
+        description='Match any (default) or all of the given ids',
+    ),
+    OpenApiParameter(
+        'search',
+        OpenApiTypes.STR,
+        description='Full text search, ranked when listing',
+    ),
+    OpenApiParameter(
+        'time_minutes_min',
+        OpenApiTypes.INT,
+        description='Only recipes taking at least this many minutes',
+    ),
+    OpenApiParameter(
+        'time_minutes_max',
+        OpenApiTypes.INT,
+        description='Only recipes taking at most this many minutes',
+    ),
+    OpenApiParameter(
+        'price_min',
+        OpenApiTypes.DECIMAL,
+        description='Only recipes costing at least this much',
+    ),
+    OpenApiParameter(
+        'price_max',
+        OpenApiTypes.DECIMAL,
+        description='Only recipes costing at most this much',
+    ),
+    OpenApiParameter(
+        'ordering',
+        OpenApiTypes.STR, enum=list(filters.ORDERINGS),
+        description='Sort column, prefixed with - for descending',
+    ),
+]
+
+PAGE_PARAMETER = OpenApiParameter(
+    'page',
+    OpenApiTypes.INT,
+    description='Use page number pagination with a total count',
+)
+
+extend_schema_view(
+    list=extend_schema(
+        parameters=RECIPE_QUERY_PARAMETERS + [
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description='Comma separated list of fields to return',
+            ),
+            PAGE_PARAMETER,
+        ]
+    )
+)(views.RecipeViewSet)
+
+extend_schema(
+    request=serializers.RecipeDetailSerializer(many=True),
+    responses={200: OpenApiTypes.OBJECT},
+)(views.RecipeViewSet.bulk)
+
+extend_schema(
+    parameters=RECIPE_QUERY_PARAMETERS,
+    responses={200: OpenApiTypes.STR},
+)(views.RecipeViewSet.export)
+
+extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'assigned_only',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Filter by items assigned to recipes',
+            ),
+            OpenApiParameter(
+                'sort',
+                OpenApiTypes.STR, enum=['name', 'popular'],
+                description='Order by name or by number of recipes',
+            ),
+            PAGE_PARAMETER,
+        ]
+    )
+)(views.BaseRecipeAttrViewSet)
+
+extend_schema(
+    parameters=[
+        OpenApiParameter(
+            'q',
+            OpenApiTypes.STR,
+            description='Text typed so far',
+        ),
+        OpenApiParameter(
+            'limit',
+            OpenApiTypes.INT,
+            description=(
+                f'Number of names to return, at most '
+                f'{completion.MAX_LIMIT}'
+            ),
+        ),
+    ],
+)(views.BaseRecipeAttrViewSet.autocomplete)
+
+extend_schema_field(OpenApiTypes.OBJECT)(
+    serializers.RecipeSerializer.get_image_variants
+)
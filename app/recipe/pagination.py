@@ -0,0 +1,147 @@
+"""
+Keyset cursor and opt-in page number pagination
+"""
+
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination, so deep pages cost the same as the first one.
+
+    DRF's cursor only holds the first ordering column and skips the rows
+    that tie with it by an offset, capped at `offset_cutoff`. This one
+    holds the value of every column of the ordering, which ends with the
+    unique id, and starts a page at the row after those values, so ties
+    take no offset however many there are.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """The view's ordering for the request, if it picks one."""
+        get_ordering = getattr(view, 'get_ordering', None)
+        if get_ordering is not None:
+            return tuple(get_ordering())
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self._decode_position()
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(_reverse(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(_after(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Nothing before the position, the next page is the first.
+            return self.encode_cursor(Cursor(0, False, None))
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Nothing after the position, the previous page is the last.
+            return self.encode_cursor(Cursor(0, True, None))
+        return self._link(self.page[0], reverse=True)
+
+    def _link(self, instance, reverse):
+        position = json.dumps([
+            str(self._get_value(instance, field)) for field in self.ordering
+        ])
+        return self.encode_cursor(Cursor(0, reverse, position))
+
+    def _get_value(self, instance, field):
+        name = field.lstrip('-')
+        if isinstance(instance, dict):
+            return instance[name]
+        return getattr(instance, name)
+
+    def _decode_position(self):
+        if self.cursor is None or self.cursor.position is None:
+            return None
+        try:
+            position = json.loads(self.cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not (
+            isinstance(position, list)
+            and len(position) == len(self.ordering)
+            and all(isinstance(value, str) for value in position)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+
+def _reverse(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _after(ordering, position):
+    """The rows after `position` in `ordering`, compared column by
+    column: a greater first column, or an equal one and a greater
+    second and so on."""
+    conditions = []
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {
+            other.lstrip('-'): value
+            for other, value in zip(ordering[:i], position)
+        }
+        conditions.append(Q(**equal, **{f'{name}__{lookup}': position[i]}))
+    return reduce(or_, conditions)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    ordering = ('-name', '-id')
+
+
+class RecipePageNumberPagination(PageNumberPagination):
+    """Opt-in page number mode for clients that need a total count."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
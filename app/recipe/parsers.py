@@ -0,0 +1,45 @@
+"""
+Streaming NDJSON parser for the bulk import
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class InvalidLine:
+    """Stands for a line that isn't JSON, so the import reports it as
+    that item's error and goes on with the next lines."""
+
+    def __init__(self, line_number, error):
+        self.line_number = line_number
+        self.error = error
+
+    @property
+    def message(self):
+        return f'NDJSON parse error on line {self.line_number} - {self.error}'
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline delimited JSON lazily, one object per line."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self._iter_objects(stream, encoding)
+
+    def _iter_objects(self, stream, encoding):
+        # Earlier chunks may be committed by the time a bad line is read,
+        # so it becomes an item of its own rather than a ParseError.
+        if stream is None:
+            return
+        for line_number, line in enumerate(stream, start=1):
+            try:
+                line = line.decode(encoding).strip()
+                if not line:
+                    continue
+                yield json.loads(line)
+            except ValueError as exc:
+                yield InvalidLine(line_number, exc)
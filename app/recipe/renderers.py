@@ -0,0 +1,75 @@
+"""
+NDJSON and CSV renderers streaming the recipe export
+"""
+
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render rows as newline delimited JSON, one row per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.render_rows(rows))
+
+    def render_rows(self, rows):
+        for row in rows:
+            yield json.dumps(row, cls=JSONEncoder).encode() + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Render recipe rows as CSV, nested names joined with `;`."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    header = [
+        'id',
+        'title',
+        'description',
+        'time_minutes',
+        'price',
+        'link',
+        'tags',
+        'ingrediants',
+    ]
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.render_rows(rows))
+
+    def render_rows(self, rows):
+        writer = csv.DictWriter(
+            _Echo(),
+            fieldnames=self.header,
+            extrasaction='ignore',
+        )
+        yield writer.writeheader().encode(self.charset)
+        for row in rows:
+            row = {
+                key: self._flatten(value) for key, value in row.items()
+            }
+            yield writer.writerow(row).encode(self.charset)
+
+    def _flatten(self, value):
+        if not isinstance(value, list):
+            return value
+        return ';'.join(
+            item['name'] if isinstance(item, dict) else str(item)
+            for item in value
+        )
@@ -0,0 +1,74 @@
+"""
+Full text search over recipes, their tags and ingrediants
+"""
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+
+from core.models import Recipe, Tag, Ingrediant
+
+SEARCH_CONFIG = 'english'
+
+
+def _names(model):
+    """Space separated names of the recipe's tags or ingrediants."""
+    names = model.objects.filter(
+        recipe=OuterRef('pk'),
+    ).values('recipe').annotate(
+        names=StringAgg('name', ' '),
+    ).values('names')
+    return Coalesce(Subquery(names), Value(''))
+
+
+def search_vector(tag_model=Tag, ingrediant_model=Ingrediant):
+    """Weighted document of a recipe: title, description, then names."""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            _names(tag_model),
+            _names(ingrediant_model),
+            weight='C',
+            config=SEARCH_CONFIG,
+        )
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Rebuild the stored vectors of the recipes in one UPDATE.
+
+    `recipe_ids` can be a list or a `values('pk')` queryset.
+    """
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=search_vector(),
+    )
+
+
+def _query(text):
+    return SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+
+
+def search(queryset, text):
+    """Recipes matching a web search style query (`"a b" or c -d`)."""
+    return queryset.filter(search_vector=_query(text))
+
+
+def rank(queryset, text):
+    """Order matches by relevance and add a highlighted `headline`."""
+    query = _query(text)
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), query),
+        headline=SearchHeadline(
+            Concat('title', Value(' '), 'description'),
+            query,
+            config=SEARCH_CONFIG,
+            max_fragments=2,
+        ),
+    ).order_by('-rank', '-id')
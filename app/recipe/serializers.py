@@ -2,49 +2,147 @@
 Docstring for app.recipe.serializers
 """
 
+from django.db import transaction
+from django.utils.translation import gettext as _
 from rest_framework import serializers
+from core.instrumentation import InstrumentedSerializerMixin
 from core.models import Recipe, Tag, Ingrediant
+from core.storage import update_references
+from recipe import filters
+from recipe.uploadhandlers import FORMAT_EXTENSIONS
 
-class TagSerializer(serializers.ModelSerializer):
+
+def image_storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def get_or_create_by_name(model, user, names):
+    """Resolve names with one lookup and one bulk insert."""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    objs = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = [name for name in names if name not in objs]
+    if missing:
+        # Rows created concurrently are skipped here and picked up by
+        # the lookup below, the (user, name) constraint keeps it unique.
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objs.update(
+            (obj.name, obj)
+            for obj in model.objects.filter(user=user, name__in=missing)
+        )
+    return [objs[name] for name in names]
+
+
+class RecipeAttrSerializer(
+    InstrumentedSerializerMixin,
+    serializers.ModelSerializer,
+):
+    def validate_name(self, value):
+        if self.instance is None:
+            return value
+        model = type(self.instance)
+        exists = model.objects.filter(
+            user=self.instance.user,
+            name=value,
+        ).exclude(pk=self.instance.pk).exists()
+        if exists:
+            msg = _('an item with this name already exists')
+            raise serializers.ValidationError(msg, code='unique')
+        return value
+
+
+class TagSerializer(RecipeAttrSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class IngrediantSerializer(serializers.ModelSerializer):
+class IngrediantSerializer(RecipeAttrSerializer):
     class Meta:
         model = Ingrediant
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class SparseFieldsMixin:
+    """Serialize only the `fields` passed to the constructor."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(
+    InstrumentedSerializerMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer,
+):
 
     tags = TagSerializer(many=True, required=False)
     ingrediants = IngrediantSerializer(many=True, required=False)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingrediants']
-        read_only_fields = ['id']
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link', 'tags',
+            'ingrediants', 'image_status', 'image_variants',
+        ]
+        read_only_fields = ['id', 'image_status']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def get_image_variants(self, obj):
+        """Map of variant label to `{extension: url}`."""
+        storage = image_storage()
+        request = self.context.get('request')
+        urls = {}
+        for label, names in obj.image_variants.items():
+            urls[label] = {}
+            for ext, name in names.items():
+                url = storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[label][ext] = url
+        return urls
+
+    def _get_or_create_attrs(self, model, items):
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        return get_or_create_by_name(
+            model,
+            auth_user,
+            [item['name'] for item in items],
+        )
+
+    def _get_or_create_tags(self, tags, recipe):
+        tag_objs = self._get_or_create_attrs(Tag, tags)
+        if tag_objs:
+            recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingrediant(self, ingrediants, recipe):
-        auth_user = self.context['request'].user
-        for ingrediant in ingrediants:
-            ingrediant_obj, created = Ingrediant.objects.get_or_create(
-                user=auth_user,
-                **ingrediant,
-            )
-            recipe.ingrediants.add(ingrediant_obj)
+        ingrediant_objs = self._get_or_create_attrs(Ingrediant, ingrediants)
+        if ingrediant_objs:
+            recipe.ingrediants.add(*ingrediant_objs)
 
+    def _set_related(self, manager, objs):
+        """Only delete and insert the through rows that changed."""
+        current_ids = {obj.pk for obj in manager.all()}
+        wanted_ids = {obj.pk for obj in objs}
+        removed_ids = current_ids - wanted_ids
+        if removed_ids:
+            manager.remove(*removed_ids)
+        added = [obj for obj in objs if obj.pk not in current_ids]
+        if added:
+            manager.add(*added)
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         ingrediants = validated_data.pop('ingrediants', [])
@@ -52,30 +150,136 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingrediant(ingrediants, recipe)
         return recipe
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingrediants = validated_data.pop('ingrediants', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_related(
+                instance.tags,
+                self._get_or_create_attrs(Tag, tags),
+            )
         if ingrediants is not None:
-            instance.ingrediants.clear()
-            self._get_or_create_ingrediant(ingrediants, instance)
+            self._set_related(
+                instance.ingrediants,
+                self._get_or_create_attrs(Ingrediant, ingrediants),
+            )
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
         return instance
 
+
+class RecipeSearchSerializer(RecipeSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['rank', 'headline']
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(
+    InstrumentedSerializerMixin,
+    serializers.ModelSerializer,
+):
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = ['id', 'image', 'image_status']
+        read_only_fields = ['id', 'image_status']
         extra_kwargs = {'image': {'required': 'True'}}
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        image = validated_data['image']
+        instance.image_hash = getattr(image, 'sha256', '')
+        if instance.image_hash:
+            image.name = (
+                instance.image_hash + FORMAT_EXTENSIONS[image.image_format]
+            )
+        previous = instance.media_names()
+        # Variants of the previous image are stale until the job reruns.
+        instance.image_status = Recipe.IMAGE_PENDING
+        instance.image_variants = {}
+        instance = super().update(instance, validated_data)
+        update_references(added=instance.media_names(), removed=previous)
+        return instance
+
+
+class CommaSeparatedField(serializers.CharField):
+    """A comma separated query parameter, each item validated by `child`.
+
+    A blank value is an empty list.
+    """
+
+    def __init__(self, child, **kwargs):
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('allow_blank', True)
+        super().__init__(**kwargs)
+        self.child = child
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+        if not data:
+            return []
+        return [
+            self.child.run_validation(item.strip())
+            for item in data.split(',')
+        ]
+
+
+class RecipeQuerySerializer(serializers.Serializer):
+    """Query parameters of the recipe list and export.
+
+    The serializer fields `fields` may pick from come in the
+    `allowed_fields` context.
+    """
+    tags = CommaSeparatedField(serializers.IntegerField())
+    ingrediants = CommaSeparatedField(serializers.IntegerField())
+    match = serializers.ChoiceField(
+        choices=filters.MATCH_MODES,
+        default=filters.MATCH_ANY,
+    )
+    search = serializers.CharField(required=False, allow_blank=True)
+    time_minutes_min = serializers.IntegerField(required=False, min_value=0)
+    time_minutes_max = serializers.IntegerField(required=False, min_value=0)
+    price_min = serializers.DecimalField(
+        max_digits=None,
+        decimal_places=None,
+        required=False,
+        min_value=0,
+    )
+    price_max = serializers.DecimalField(
+        max_digits=None,
+        decimal_places=None,
+        required=False,
+        min_value=0,
+    )
+    ordering = serializers.ChoiceField(
+        choices=filters.ORDERINGS,
+        required=False,
+    )
+    fields = CommaSeparatedField(serializers.CharField())
+
+    def validate_fields(self, value):
+        allowed = self.context.get('allowed_fields', ())
+        unknown = [name for name in value if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError(
+                _('unknown fields: %s') % ', '.join(unknown)
+            )
+        return value
 
-    
\ No newline at end of file
+    def validate(self, attrs):
+        for name in ('time_minutes', 'price'):
+            low = attrs.get(f'{name}_min')
+            high = attrs.get(f'{name}_max')
+            if low is not None and high is not None and low > high:
+                raise serializers.ValidationError({
+                    f'{name}_min': [_('must not be greater than the max')],
+                })
+        return attrs
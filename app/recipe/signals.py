@@ -0,0 +1,131 @@
+"""
+Signal handlers keeping Recipe.search_vector and recipe_count current
+"""
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingrediant
+from recipe.search import update_search_vectors
+from recipe.usage import RELATED_FIELDS, adjust_recipe_counts, through_of
+
+SEARCHED_FIELDS = {'title', 'description'}
+
+
+def _recipes_of(instance):
+    field = RELATED_FIELDS[type(instance)]
+    return Recipe.objects.filter(**{field: instance}).values('pk')
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCHED_FIELDS & set(update_fields):
+        return
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingrediants.through)
+def update_vectors_on_m2m(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vectors([instance.pk])
+    elif action == 'pre_clear':
+        # Which recipes lose the name is gone after the clear.
+        instance._search_recipe_ids = list(
+            _recipes_of(instance).values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        update_search_vectors(instance._search_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        update_search_vectors(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingrediant)
+def update_vectors_on_rename(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(_recipes_of(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingrediant)
+def collect_recipes_on_delete(sender, instance, **kwargs):
+    # The through rows are deleted along with the instance.
+    instance._search_recipe_ids = list(
+        _recipes_of(instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingrediant)
+def update_vectors_on_delete(sender, instance, **kwargs):
+    update_search_vectors(instance._search_recipe_ids)
+
+
+def _linked(through, column, **filters):
+    return list(through.objects.filter(**filters).values_list(
+        column,
+        flat=True,
+    ))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingrediants.through)
+def update_recipe_counts(sender, instance, action, reverse, model, pk_set,
+                         **kwargs):
+    """Keep Tag/Ingrediant.recipe_count in step with the through rows.
+
+    Django only passes the really added ids, removals list whatever was
+    asked for, so pre_remove and pre_clear look up the existing rows.
+    """
+    target = type(instance) if reverse else model
+    through, column = through_of(target)
+    if not reverse:
+        if action == 'post_add':
+            adjust_recipe_counts(target, dict.fromkeys(pk_set, 1))
+        elif action == 'pre_remove':
+            instance._unlinked_ids = _linked(
+                through, column, recipe_id=instance.pk, **{
+                    f'{column}__in': pk_set,
+                }
+            )
+        elif action == 'pre_clear':
+            instance._unlinked_ids = _linked(
+                through, column, recipe_id=instance.pk,
+            )
+        elif action in ('post_remove', 'post_clear'):
+            adjust_recipe_counts(
+                target,
+                dict.fromkeys(instance._unlinked_ids, -1),
+            )
+    elif action == 'post_add':
+        adjust_recipe_counts(target, {instance.pk: len(pk_set)})
+    elif action in ('pre_remove', 'pre_clear'):
+        filters = {column: instance.pk}
+        if action == 'pre_remove':
+            filters['recipe_id__in'] = pk_set
+        instance._unlinked_count = through.objects.filter(**filters).count()
+    elif action in ('post_remove', 'post_clear'):
+        adjust_recipe_counts(target, {instance.pk: -instance._unlinked_count})
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_linked_on_recipe_delete(sender, instance, **kwargs):
+    # The through rows go with the recipe, without m2m_changed.
+    instance._linked_ids = {
+        model: _linked(*through_of(model), recipe_id=instance.pk)
+        for model in RELATED_FIELDS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def update_recipe_counts_on_delete(sender, instance, **kwargs):
+    for model, pks in instance._linked_ids.items():
+        adjust_recipe_counts(model, dict.fromkeys(pks, -1))
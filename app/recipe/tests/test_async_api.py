@@ -0,0 +1,140 @@
+"""
+Docstring for app.recipe.tests.test_async_api
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import concurrency, instrumentation
+from core.authentication import get_local_cache
+from core.models import Recipe, Tag
+
+ASYNC_RECIPE_URL = reverse('recipe:async-recipe-list')
+ASYNC_TAG_URL = reverse('recipe:async-tag-list')
+
+
+def async_detail_url(recipe_id):
+    return reverse('recipe:async-recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_CACHE_TIMEOUT=0, ASYNC_VIEWS={'WORKERS': 2})
+class AsyncRecipeAPITests(TransactionTestCase):
+    """The async views read through pool threads with their own
+    connections, so the rows have to be committed."""
+
+    def setUp(self):
+        get_local_cache().clear()
+        self.addCleanup(concurrency.shutdown)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'userpass',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_auth_required(self):
+        res = APIClient().get(ASYNC_RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ASYNC_RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_recipes(self):
+        create_recipe(self.user, title='mine')
+        other = get_user_model().objects.create_user('other@example.com')
+        create_recipe(other, title='theirs')
+
+        res = self.client.get(ASYNC_RECIPE_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['mine'],
+        )
+
+    def test_retrieve_recipe(self):
+        recipe = create_recipe(self.user, description='slow cooked')
+
+        res = self.client.get(async_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['description'], 'slow cooked')
+        self.assertIn('ETag', res)
+
+    def test_retrieve_other_users_recipe(self):
+        other = get_user_model().objects.create_user('other@example.com')
+        recipe = create_recipe(other)
+
+        res = self.client.get(async_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_tags(self):
+        Tag.objects.create(user=self.user, name='vegan')
+
+        res = self.client.get(ASYNC_TAG_URL)
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['vegan'],
+        )
+
+    def test_cached_token_skips_pool(self):
+        self.client.get(ASYNC_RECIPE_URL)
+
+        with patch(
+            'core.authentication.run_sync',
+            side_effect=AssertionError('token lookup left the event loop'),
+        ):
+            res = self.client.get(ASYNC_RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_instrumented(self):
+        create_recipe(self.user)
+        instrumentation.reset_metrics()
+        self.addCleanup(instrumentation.reset_metrics)
+        config = {
+            'SAMPLE_RATE': 1,
+            'SERVER_TIMING': True,
+            'METRICS_IPS': [],
+            'COLLECTORS': {},
+        }
+
+        with override_settings(INSTRUMENTATION=config):
+            res = self.client.get(ASYNC_RECIPE_URL)
+
+        # Queries made in the pool threads are counted too.
+        self.assertRegex(res['Server-Timing'], r'desc="[1-9]\d* queries"')
+        self.assertIn(
+            ('RecipeViewSet.list', 'GET'),
+            instrumentation.get_metrics(),
+        )
+
+    def test_post_not_allowed(self):
+        res = self.client.post(ASYNC_RECIPE_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -50,7 +50,7 @@ class PrivateIngrediantsApiTest(TestCase):
         serializer = IngrediantSerializer(ingrediant, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingrediant_limited_to_user(self):
         user2 = create_user(email='user2@example.com')
@@ -59,9 +59,9 @@ class PrivateIngrediantsApiTest(TestCase):
         res = self.client.get(INGREDIANTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingrediant.name)
-        self.assertEqual(res.data[0]['id'], ingrediant.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingrediant.name)
+        self.assertEqual(res.data['results'][0]['id'], ingrediant.id)
 
     def test_update_ingrediant(self):
         ingrediant = Ingrediant.objects.create(user=self.user, name='test name')
@@ -99,8 +99,8 @@ class PrivateIngrediantsApiTest(TestCase):
         s1 = IngrediantSerializer(ingrediant1)
         s2 = IngrediantSerializer(ingrediant2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingrediants_unique(self):
         ingrediant = Ingrediant.objects.create(user=self.user, name='ingrediant')
@@ -121,8 +121,16 @@ class PrivateIngrediantsApiTest(TestCase):
         recipe2.ingrediants.add(ingrediant)
 
         res = self.client.get(INGREDIANTS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
-
+        self.assertEqual(len(res.data['results']), 1)
 
+    def test_autocomplete_ingrediants(self):
+        Ingrediant.objects.create(user=self.user, name='Garlic')
+        Ingrediant.objects.create(user=self.user, name='Ginger')
 
+        res = self.client.get(
+            reverse('recipe:ingrediant-autocomplete'),
+            {'q': 'gar'},
+        )
 
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['name'] for i in res.data], ['Garlic'])
@@ -2,16 +2,26 @@
 Docstring for app.recipe.tests.test_recipe_api
 """
 
+from datetime import timedelta
 from decimal import Decimal
+import hashlib
+from io import StringIO
 import tempfile
 import os
+from unittest.mock import patch
 from PIL import Image
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Recipe, Tag, Ingrediant
+from core.models import Recipe, Tag, Ingrediant, MediaBlob
+from recipe.uploadhandlers import ImageUploadHandler
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
@@ -64,7 +74,7 @@ class PrivateRecipeAPITest(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         other_user = create_user(email='user1@example.com', password='userpass')
@@ -76,7 +86,7 @@ class PrivateRecipeAPITest(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -213,6 +223,21 @@ class PrivateRecipeAPITest(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_with_duplicate_tag_names(self):
+        payload = {
+            'title': 'recipe title',
+            'time_minutes': 30,
+            'price': Decimal('30.2'),
+            'tags': [{'name': 'dinner'}, {'name': 'dinner'}],
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_on_update(self):
         recipe = create_recipe(user=self.user)
         payload = {'tags':[{'name': 'lunch'}]}
@@ -237,6 +262,55 @@ class PrivateRecipeAPITest(TestCase):
         self.assertIn(tag_lunch, recipe.tags.all())
         self.assertNotIn(tag_breakfast, recipe.tags.all())
 
+    def test_update_tags_keeps_unchanged_through_rows(self):
+        tag_keep = Tag.objects.create(user=self.user, name='keep')
+        tag_drop = Tag.objects.create(user=self.user, name='drop')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag_keep, tag_drop)
+        through = Recipe.tags.through
+        kept_row = through.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {'tags': [{'name': 'keep'}, {'name': 'new'}]}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            through.objects.get(recipe=recipe, tag=tag_keep).pk,
+            kept_row.pk,
+        )
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'keep', 'new'},
+        )
+
+    def test_update_unchanged_tags_skips_through_writes(self):
+        tag = Tag.objects.create(user=self.user, name='keep')
+        ingrediant = Ingrediant.objects.create(user=self.user, name='salt')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        recipe.ingrediants.add(ingrediant)
+
+        payload = {
+            'tags': [{'name': 'keep'}],
+            'ingrediants': [{'name': 'salt'}],
+        }
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        through_tables = (
+            Recipe.tags.through._meta.db_table,
+            Recipe.ingrediants.through._meta.db_table,
+        )
+        writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+            and any(table in query['sql'] for table in through_tables)
+        ]
+        self.assertEqual(writes, [])
+
     def test_clear_recipe_tags(self):
         tag = Tag.objects.create(user=self.user, name='dessert')
         recipe = create_recipe(user=self.user)
@@ -351,9 +425,9 @@ class PrivateRecipeAPITest(TestCase):
         s2 = RecipeSerializer(recipe2)
         s3 = RecipeSerializer(recipe3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
     
     def test_filter_by_ingrediants(self):
         recipe1 = create_recipe(user=self.user, title='recipe1')
@@ -373,12 +447,363 @@ class PrivateRecipeAPITest(TestCase):
         s2 = RecipeSerializer(recipe2)
         s3 = RecipeSerializer(recipe3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_all_tags(self):
+        tag1 = Tag.objects.create(user=self.user, name='tag1')
+        tag2 = Tag.objects.create(user=self.user, name='tag2')
+        both = create_recipe(user=self.user, title='both')
+        both.tags.add(tag1, tag2)
+        create_recipe(user=self.user, title='one').tags.add(tag1)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{tag1.id},{tag2.id},{tag1.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['both'],
+        )
+
+    def test_filter_by_all_of_many_tags(self):
+        tags = [
+            Tag.objects.create(user=self.user, name=f'tag{i}')
+            for i in range(5)
+        ]
+        create_recipe(user=self.user, title='all').tags.add(*tags)
+        create_recipe(user=self.user, title='most').tags.add(*tags[1:])
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': ','.join(str(tag.id) for tag in tags),
+            'match': 'all',
+        })
+
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['all'],
+        )
+
+    def test_filter_by_tags_and_ingrediants(self):
+        tag = Tag.objects.create(user=self.user, name='tag')
+        ingrediant = Ingrediant.objects.create(user=self.user, name='ingr')
+        match = create_recipe(user=self.user, title='match')
+        match.tags.add(tag)
+        match.ingrediants.add(ingrediant)
+        create_recipe(user=self.user, title='tag only').tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {
+                'tags': str(tag.id),
+                'ingrediants': str(ingrediant.id),
+            })
+
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['match'],
+        )
+        for query in ctx.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'])
+
+    def test_filter_invalid_match(self):
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_invalid_ids(self):
+        for params in ({'tags': '1,a'}, {'ingrediants': '1,,2'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def test_filter_time_and_price_ranges(self):
+        create_recipe(user=self.user, title='quick', time_minutes=10)
+        create_recipe(user=self.user, title='slow', time_minutes=90)
+        create_recipe(
+            user=self.user, title='pricey', time_minutes=30,
+            price=Decimal('20.00'),
+        )
+
+        res = self.client.get(RECIPE_URL, {
+            'time_minutes_min': 10,
+            'time_minutes_max': 60,
+            'price_max': '10.5',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['quick'],
+        )
+
+    def test_filter_invalid_ranges(self):
+        for params in (
+            {'time_minutes_min': 'soon'},
+            {'price_max': '-1'},
+            {'price_min': '5', 'price_max': '2'},
+        ):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_cursor_pagination(self):
+        prices = ['3.00', '1.00', '2.00', '1.00']
+        recipes = [
+            create_recipe(user=self.user, price=Decimal(price))
+            for price in prices
+        ]
+
+        res = self.client.get(RECIPE_URL, {
+            'ordering': 'price',
+            'page_size': 3,
+        })
+        ids = [recipe['id'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(ids, [
+            recipes[1].id, recipes[3].id, recipes[2].id, recipes[0].id,
+        ])
+
+    def test_ordering_cursor_pagination_ties(self):
+        """More equal values than DRF's offset_cutoff of 1000."""
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                title=f'recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            for i in range(1100)
+        )
+        params = {'ordering': 'time_minutes', 'page_size': 500}
+
+        res = self.client.get(RECIPE_URL, params)
+        pages = [res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(res.data['results'])
+        ids = [r['id'] for page in pages for r in page]
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(ids, sorted(recipe.id for recipe in recipes))
+
+        res = self.client.get(res.data['previous'])
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [r['id'] for r in pages[1]],
+        )
+
+    def test_ordering_cursor_invalid(self):
+        res = self.client.get(RECIPE_URL, {
+            'ordering': 'price',
+            'cursor': 'cD01',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ordering_invalid(self):
+        res = self.client.get(RECIPE_URL, {'ordering': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fields(self):
+        recipe = create_recipe(user=self.user, title='soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='tag'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': recipe.id, 'title': 'soup'}],
+        )
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('"core_recipe"."link"', sql)
+        self.assertNotIn('core_tag', sql)
+
+    def test_sparse_fields_unknown(self):
+        res = self.client.get(RECIPE_URL, {'fields': 'title,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_cursor_pagination(self):
+        recipes = [
+            create_recipe(user=self.user, title=f'recipe {i}')
+            for i in range(3)
+        ]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[2].id, recipes[1].id],
+        )
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(res.data['next'])
 
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[0].id],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_list_page_number_pagination(self):
+        for i in range(3):
+            create_recipe(user=self.user, title=f'recipe {i}')
+
+        res = self.client.get(RECIPE_URL, {'page': 2, 'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(len(res.data['results']), 1)
 
 
+@override_settings(RECIPE_CACHE_TIMEOUT=0)
+class RecipeQueryCountTests(TestCase):
+    """Query counts must not grow with the number of recipes or relations."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='userpass')
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            recipe = create_recipe(user=self.user, title=f'recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'tag {i}'),
+            )
+            recipe.ingrediants.add(
+                Ingrediant.objects.create(user=self.user, name=f'ingr {i}'),
+            )
+
+    def _count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            res = func()
+        self.assertLess(res.status_code, 300)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count(self):
+        self._create_recipes(1)
+        small = self._count_queries(lambda: self.client.get(RECIPE_URL))
+        self._create_recipes(10)
+        large = self._count_queries(lambda: self.client.get(RECIPE_URL))
+
+        # ETag aggregate, recipes, tags and ingrediants.
+        self.assertEqual(small, 4)
+        self.assertEqual(large, small)
+
+    def test_detail_query_count(self):
+        self._create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+        url = detail_url(recipe.id)
+        small = self._count_queries(lambda: self.client.get(url))
+        self._create_recipes(10)
+        large = self._count_queries(lambda: self.client.get(url))
+
+        self.assertEqual(small, 4)
+        self.assertEqual(large, small)
+
+    def test_create_query_count(self):
+        payload = {
+            'title': 'new recipe',
+            'time_minutes': 10,
+            'price': Decimal('2.50'),
+            'tags': [{'name': 'tag 0'}],
+            'ingrediants': [{'name': 'ingr 0'}],
+        }
+        self._create_recipes(1)
+        small = self._count_queries(
+            lambda: self.client.post(RECIPE_URL, payload, format='json')
+        )
+        self._create_recipes(10)
+        large = self._count_queries(
+            lambda: self.client.post(RECIPE_URL, payload, format='json')
+        )
+
+        self.assertEqual(large, small)
+
+    def test_create_query_count_independent_of_tags(self):
+        Tag.objects.create(user=self.user, name='existing')
+
+        def payload(count):
+            return {
+                'title': 'new recipe',
+                'time_minutes': 10,
+                'price': Decimal('2.50'),
+                'tags': [{'name': 'existing'}] + [
+                    {'name': f'new {count} {i}'} for i in range(count)
+                ],
+                'ingrediants': [
+                    {'name': f'new {count} {i}'} for i in range(count)
+                ],
+            }
+
+        small = self._count_queries(
+            lambda: self.client.post(RECIPE_URL, payload(1), format='json')
+        )
+        large = self._count_queries(
+            lambda: self.client.post(RECIPE_URL, payload(30), format='json')
+        )
+
+        self.assertEqual(large, small)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 32)
+
+    def test_update_query_count_independent_of_changes(self):
+        tags = [
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+            for i in range(20)
+        ]
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(*tags[:10])
+        url = detail_url(recipe.id)
+
+        def payload(names):
+            return {'tags': [{'name': name} for name in names]}
+
+        small = self._count_queries(
+            lambda: self.client.patch(
+                url, payload(['tag 0', 'tag 1', 'tag 10']), format='json',
+            )
+        )
+        large = self._count_queries(
+            lambda: self.client.patch(
+                url, payload([f'tag {i}' for i in range(5, 20)]),
+                format='json',
+            )
+        )
+
+        self.assertEqual(large, small)
+
+    def test_update_query_count(self):
+        payload = {
+            'title': 'updated recipe',
+            'tags': [{'name': 'tag 0'}],
+            'ingrediants': [{'name': 'ingr 0'}],
+        }
+        self._create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+        url = detail_url(recipe.id)
+        small = self._count_queries(
+            lambda: self.client.patch(url, payload, format='json')
+        )
+        self._create_recipes(10)
+        large = self._count_queries(
+            lambda: self.client.patch(url, payload, format='json')
+        )
+
+        self.assertEqual(large, small)
+
 
 class ImageUploadTests(TestCase):
     def setUp(self):
@@ -391,8 +816,25 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        storage = self.recipe.image.storage
+        for names in self.recipe.image_variants.values():
+            for name in names.values():
+                storage.delete(name)
         self.recipe.image.delete()
 
+    def _upload(self, size=(10, 10), **save_kwargs):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size)
+            img.save(image_file, format='JPEG', **save_kwargs)
+            image_file.seek(0)
+            return self.client.post(
+                url,
+                {'image': image_file},
+                format='multipart',
+            )
+
     def test_upload_image(self):
         url = image_upload_url(self.recipe.id)
         with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
@@ -403,9 +845,188 @@ class ImageUploadTests(TestCase):
             res = self.client.post(url, payload, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(self.recipe.image_variants, {})
+
+    @override_settings(IMAGE_PROCESSING={
+        **settings.IMAGE_PROCESSING,
+        'EAGER': True,
+        'VARIANTS': {'thumbnail': 20},
+    })
+    def test_upload_image_creates_variants(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'camera maker'
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload(size=(80, 40), exif=exif)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(
+            set(self.recipe.image_variants['thumbnail']),
+            {'webp', 'jpg'},
+        )
+        storage = self.recipe.image.storage
+        for name in self.recipe.image_variants['thumbnail'].values():
+            with Image.open(storage.path(name)) as variant:
+                self.assertEqual(variant.size, (20, 10))
+                self.assertEqual(len(variant.getexif()), 0)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(
+            res.data['image_variants']['thumbnail']['webp'].startswith(
+                'http://testserver/static/media/'
+            )
+        )
+
+    @override_settings(IMAGE_PROCESSING={
+        **settings.IMAGE_PROCESSING,
+        'EAGER': True,
+    })
+    def test_upload_image_unreadable_file_fails(self):
+        with self.assertLogs('recipe.images', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._upload()
+                self.recipe.refresh_from_db()
+                with self.recipe.image.open('wb') as f:
+                    f.write(b'truncated')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertEqual(self.recipe.image_variants, {})
+
+    @override_settings(IMAGE_PROCESSING={
+        **settings.IMAGE_PROCESSING,
+        'VARIANTS': {'thumbnail': 20},
+    })
+    def test_process_pending_images(self):
+        # Not eager and the on commit callback never runs: a lost job.
+        self._upload()
+        recent = create_recipe(user=self.user, image=self.recipe.image.name)
+        Recipe.objects.filter(pk__in=[self.recipe.pk, recent.pk]).update(
+            image_status=Recipe.IMAGE_PENDING,
+        )
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+
+        out = StringIO()
+        call_command('process_pending_images', stdout=out)
+
+        self.assertIn('Processed 1 pending images', out.getvalue())
+        self.recipe.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(
+            set(self.recipe.image_variants['thumbnail']),
+            {'webp', 'jpg'},
+        )
+        self.assertEqual(recent.image_status, Recipe.IMAGE_PENDING)
+
+    def test_upload_image_content_addressed(self):
+        other = create_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix='.jpeg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            content = image_file.read()
+            for recipe in (self.recipe, other):
+                image_file.seek(0)
+                res = self.client.post(
+                    image_upload_url(recipe.id),
+                    {'image': image_file},
+                    format='multipart',
+                )
+                self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(self.recipe.image_hash, digest)
+        self.assertEqual(
+            self.recipe.image.name,
+            f'uploads/recipe/{digest}.jpg',
+        )
+        self.assertEqual(other.image.name, self.recipe.image.name)
+        blob = MediaBlob.objects.get(name=self.recipe.image.name)
+        self.assertEqual(blob.ref_count, 2)
+
+    def test_replace_image_releases_previous(self):
+        self._upload(size=(10, 10))
+        self.recipe.refresh_from_db()
+        previous = self.recipe.image.name
+        self.recipe.image.storage.delete(previous)
+
+        self._upload(size=(20, 20))
+
+        self.assertEqual(MediaBlob.objects.get(name=previous).ref_count, 0)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            MediaBlob.objects.get(name=self.recipe.image.name).ref_count,
+            1,
+        )
+
+    @override_settings(IMAGE_UPLOAD={
+        **settings.IMAGE_UPLOAD,
+        'MAX_BYTES': 1024,
+    })
+    def test_upload_image_too_large(self):
+        res = self._upload(size=(200, 200), quality=100)
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(IMAGE_UPLOAD={
+        **settings.IMAGE_UPLOAD,
+        'MAX_DIMENSION': 50,
+    })
+    def test_upload_image_dimensions_too_large(self):
+        res = self._upload(size=(60, 10))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'][0].code, 'too_large')
+
+    def test_upload_image_unsupported_format(self):
+        with tempfile.NamedTemporaryFile(suffix='.gif') as image_file:
+            Image.new('P', (10, 10)).save(image_file, format='GIF')
+            image_file.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': image_file},
+                format='multipart',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'][0].code, 'invalid_format')
+
+    def test_upload_image_rejects_non_image_file(self):
+        handler_cls = ImageUploadHandler
+        with patch.object(
+            handler_cls,
+            'receive_data_chunk',
+            autospec=True,
+            side_effect=handler_cls.receive_data_chunk,
+        ) as receive, tempfile.NamedTemporaryFile(suffix='.jpg') as f:
+            # Several chunks of garbage, only the sniff window is read.
+            f.write(b'x' * (settings.IMAGE_UPLOAD['SNIFF_BYTES'] * 2))
+            f.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': f},
+                format='multipart',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'][0].code, 'invalid_image')
+        # Chunks don't line up with the file start, allow for one extra.
+        chunks = settings.IMAGE_UPLOAD['SNIFF_BYTES'] // handler_cls.chunk_size
+        self.assertLessEqual(receive.call_count, chunks + 1)
 
     def test_upload_image_bad_request(self):
         url = image_upload_url(self.recipe.id)
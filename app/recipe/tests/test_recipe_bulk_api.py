@@ -0,0 +1,238 @@
+"""
+Docstring for app.recipe.tests.test_recipe_bulk_api
+"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingrediant
+
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_user(email='user@example.com', password='userpass'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def recipe_payload(i, **params):
+    payload = {
+        'title': f'recipe {i}',
+        'time_minutes': 10,
+        'price': '4.50',
+        'tags': [{'name': 'dinner'}, {'name': f'tag {i}'}],
+        'ingrediants': [{'name': 'salt'}],
+    }
+    payload.update(params)
+    return payload
+
+
+class PrivateRecipeBulkApiTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_import_json(self):
+        Tag.objects.create(user=self.user, name='dinner')
+        payload = [recipe_payload(i) for i in range(3)]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['failed'], 0)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Ingrediant.objects.filter(user=self.user).count(), 1)
+        for result in res.data['results']:
+            recipe = recipes.get(id=result['id'])
+            self.assertEqual(recipe.title, f"recipe {result['index']}")
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingrediants.count(), 1)
+
+    def test_bulk_import_reports_invalid_items(self):
+        payload = [
+            recipe_payload(0),
+            recipe_payload(1, time_minutes='soon'),
+            recipe_payload(2),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['created', 'invalid', 'created'],
+        )
+        self.assertIn('time_minutes', res.data['results'][1]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_import_ndjson(self):
+        body = '\n'.join(json.dumps(recipe_payload(i)) for i in range(2))
+
+        res = self.client.post(
+            BULK_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_import_ndjson_bad_line(self):
+        lines = [json.dumps(recipe_payload(i)) for i in range(5)]
+        lines[3] = '{"title": '
+
+        with patch('recipe.bulk.CHUNK_SIZE', 2):
+            res = self.client.post(
+                BULK_URL,
+                '\n'.join(lines),
+                content_type='application/x-ndjson',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 4)
+        self.assertEqual(res.data['failed'], 1)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['created', 'created', 'created', 'invalid', 'created'],
+        )
+        self.assertIn(
+            'line 4',
+            res.data['results'][3]['errors']['non_field_errors'][0],
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
+
+    def test_bulk_import_rejects_object(self):
+        res = self.client.post(BULK_URL, recipe_payload(0), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_import_rejects_scalars(self):
+        for body in ('5', 'true', 'null', '"recipes"'):
+            res = self.client.post(
+                BULK_URL,
+                body,
+                content_type='application/json',
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(
+                res.data['detail'],
+                'Expected a list of recipes.',
+            )
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_import_query_count(self):
+        def count(size):
+            payload = [
+                recipe_payload(
+                    i,
+                    tags=[{'name': f'tag {size} {i}'}],
+                    ingrediants=[{'name': f'ingrediant {size} {i}'}],
+                )
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.data['created'], size)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count(2), count(20))
+
+    def test_export_ndjson(self):
+        other_user = create_user(email='other@example.com')
+        Recipe.objects.create(
+            user=other_user,
+            title='other',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        self.client.post(
+            BULK_URL,
+            [recipe_payload(i) for i in range(3)],
+            format='json',
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['recipe 2', 'recipe 1', 'recipe 0'],
+        )
+        self.assertEqual(
+            {tag['name'] for tag in rows[0]['tags']},
+            {'dinner', 'tag 2'},
+        )
+
+    def test_export_csv(self):
+        self.client.post(BULK_URL, [recipe_payload(0)], format='json')
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'recipe 0')
+        self.assertEqual(rows[0]['price'], '4.50')
+        self.assertEqual(
+            set(rows[0]['tags'].split(';')),
+            {'dinner', 'tag 0'},
+        )
+        self.assertEqual(rows[0]['ingrediants'], 'salt')
+
+    def test_export_applies_filters(self):
+        self.client.post(
+            BULK_URL,
+            [recipe_payload(i) for i in range(3)],
+            format='json',
+        )
+        tag = Tag.objects.get(user=self.user, name='tag 1')
+
+        res = self.client.get(EXPORT_URL, {'tags': str(tag.id)})
+
+        rows = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0])['title'], 'recipe 1')
+
+    def test_export_query_count(self):
+        def count():
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(EXPORT_URL)
+                rows = b''.join(res.streaming_content).splitlines()
+            return len(rows), len(ctx.captured_queries)
+
+        self.client.post(BULK_URL, [recipe_payload(0)], format='json')
+        small_rows, small = count()
+        self.client.post(
+            BULK_URL,
+            [recipe_payload(i) for i in range(1, 20)],
+            format='json',
+        )
+        large_rows, large = count()
+
+        self.assertEqual((small_rows, large_rows), (1, 20))
+        self.assertEqual(large, small)
@@ -0,0 +1,114 @@
+"""
+Docstring for app.recipe.tests.test_recipe_cache
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as default_cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import cache
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='userpass'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.5'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeResponseCacheTests(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+        before = cache.get_metrics()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        after = cache.get_metrics()
+        self.assertEqual(after['hits'], before['hits'] + 1)
+
+    def test_query_params_are_part_of_the_key(self):
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL, {'page_size': 1, 'page': 1})
+        before = cache.get_metrics()
+
+        self.client.get(RECIPE_URL, {'page': 1, 'page_size': 1})
+        self.client.get(RECIPE_URL, {'page': 1, 'page_size': 2})
+
+        after = cache.get_metrics()
+        self.assertEqual(after['hits'], before['hits'] + 1)
+        self.assertEqual(after['misses'], before['misses'] + 1)
+
+    def test_create_invalidates_list(self):
+        self.client.get(RECIPE_URL)
+        payload = {
+            'title': 'new recipe',
+            'time_minutes': 5,
+            'price': Decimal('1.00'),
+        }
+        self.client.post(RECIPE_URL, payload)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_update_invalidates_detail(self):
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        self.client.get(url)
+
+        self.client.patch(url, {'title': 'new title'})
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['title'], 'new title')
+
+    def test_tag_rename_invalidates_recipes(self):
+        tag = Tag.objects.create(user=self.user, name='lunch')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'dinner'})
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'dinner')
+
+    def test_cache_is_per_user(self):
+        other_user = create_user(email='other@example.com')
+        create_recipe(user=other_user)
+        other_client = APIClient()
+        other_client.force_authenticate(other_user)
+        other_client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
@@ -0,0 +1,155 @@
+"""
+Docstring for app.recipe.tests.test_recipe_conditional_api
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as default_cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='userpass'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.5'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertTrue(res.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_etag_depends_on_query_params(self):
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(
+            RECIPE_URL,
+            {'page': 1},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_on_update(self):
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        self.client.patch(detail_url(recipe.id), {'title': 'new title'})
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag_changes_on_delete(self):
+        create_recipe(user=self.user)
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_other_user_not_found(self):
+        recipe = create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list_not_modified(self):
+        tag = Tag.objects.create(user=self.user, name='lunch')
+        etag = self.client.get(TAG_URL)['ETag']
+
+        res = self.client.get(TAG_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        tag.name = 'dinner'
+        tag.save()
+        res = self.client.get(TAG_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ConditionalGetCacheTests(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cached_list_not_modified_without_queries(self):
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_list_keeps_etag(self):
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], etag)
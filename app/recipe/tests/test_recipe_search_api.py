@@ -0,0 +1,149 @@
+"""
+Docstring for app.recipe.tests.test_recipe_search_api
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingrediant
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+# Tags are changed through the ORM below, which the response cache misses.
+@override_settings(RECIPE_CACHE_TIMEOUT=0)
+class RecipeSearchApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'userpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def _titles(self, text):
+        return [r['title'] for r in self._search(text).data['results']]
+
+    def test_search_ranks_title_over_description(self):
+        create_recipe(
+            self.user,
+            title='Vegetable soup',
+            description='Served with fresh bread',
+        )
+        create_recipe(
+            self.user,
+            title='Garlic bread',
+            description='Crispy and buttery',
+        )
+        create_recipe(self.user, title='Pasta')
+
+        res = self._search('breads')
+
+        self.assertEqual(res.data['count'], 2)
+        results = res.data['results']
+        self.assertEqual(
+            [r['title'] for r in results],
+            ['Garlic bread', 'Vegetable soup'],
+        )
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertIn('<b>bread</b>', results[0]['headline'])
+
+    def test_search_matches_tag_and_ingrediant_names(self):
+        by_tag = create_recipe(self.user, title='First')
+        by_tag.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+        by_ingrediant = create_recipe(self.user, title='Second')
+        by_ingrediant.ingrediants.add(
+            Ingrediant.objects.create(user=self.user, name='tofu'),
+        )
+
+        self.assertEqual(self._titles('vegan'), ['First'])
+        self.assertEqual(self._titles('tofu'), ['Second'])
+
+    def test_search_web_syntax(self):
+        create_recipe(self.user, title='Chicken curry')
+        create_recipe(self.user, title='Vegetable curry')
+
+        self.assertEqual(self._titles('curry -chicken'), ['Vegetable curry'])
+        self.assertEqual(self._titles('"chicken curry"'), ['Chicken curry'])
+
+    def test_search_limited_to_user(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'userpass',
+        )
+        create_recipe(other, title='Lemon tart')
+        create_recipe(self.user, title='Lemon cake')
+
+        self.assertEqual(self._titles('lemon'), ['Lemon cake'])
+
+    def test_search_after_update(self):
+        recipe = create_recipe(self.user, title='Pancakes')
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Waffles', 'tags': [{'name': 'breakfast'}]},
+            format='json',
+        )
+
+        self.assertEqual(self._titles('pancakes'), [])
+        self.assertEqual(self._titles('waffles breakfast'), ['Waffles'])
+
+    def test_search_follows_tag_changes(self):
+        recipe = create_recipe(self.user, title='Salad')
+        tag = Tag.objects.create(user=self.user, name='summer')
+        recipe.tags.add(tag)
+
+        tag.name = 'winter'
+        tag.save()
+        self.assertEqual(self._titles('summer'), [])
+        self.assertEqual(self._titles('winter'), ['Salad'])
+
+        tag.recipe_set.clear()
+        self.assertEqual(self._titles('winter'), [])
+
+        recipe.tags.add(tag)
+        tag.delete()
+        self.assertEqual(self._titles('winter'), [])
+
+    def test_search_bulk_imported_recipes(self):
+        self.client.post(BULK_URL, [{
+            'title': 'Imported stew',
+            'time_minutes': 60,
+            'price': '8.00',
+            'ingrediants': [{'name': 'beef'}],
+        }], format='json')
+
+        self.assertEqual(self._titles('beef'), ['Imported stew'])
+
+    def test_search_filter_on_export(self):
+        create_recipe(self.user, title='Apple pie')
+        create_recipe(self.user, title='Cherry pie')
+
+        res = self.client.get(
+            reverse('recipe:recipe-export'),
+            {'search': 'apple'},
+        )
+
+        rows = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(len(rows), 1)
@@ -0,0 +1,161 @@
+"""
+Docstring for app.recipe.tests.test_recipe_usage
+"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingrediant
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeCountTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'userpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCounts(self, model, expected):
+        self.assertEqual(
+            dict(model.objects.values_list('name', 'recipe_count')),
+            expected,
+        )
+
+    def test_counts_follow_recipe_api(self):
+        payload = {
+            'title': 'soup',
+            'time_minutes': 10,
+            'price': '2.00',
+            'tags': [{'name': 'dinner'}, {'name': 'quick'}],
+            'ingrediants': [{'name': 'salt'}],
+        }
+        first = self.client.post(RECIPE_URL, payload, format='json')
+        self.client.post(RECIPE_URL, payload, format='json')
+        self.assertCounts(Tag, {'dinner': 2, 'quick': 2})
+        self.assertCounts(Ingrediant, {'salt': 2})
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[first.data['id']]),
+            {'tags': [{'name': 'dinner'}, {'name': 'vegan'}]},
+            format='json',
+        )
+        self.assertCounts(Tag, {'dinner': 2, 'quick': 1, 'vegan': 1})
+
+        self.client.delete(
+            reverse('recipe:recipe-detail', args=[first.data['id']]),
+        )
+        self.assertCounts(Tag, {'dinner': 1, 'quick': 1, 'vegan': 0})
+        self.assertCounts(Ingrediant, {'salt': 1})
+
+    def test_remove_unlinked_does_not_decrement(self):
+        recipe = create_recipe(self.user)
+        linked = Tag.objects.create(user=self.user, name='linked')
+        other = Tag.objects.create(user=self.user, name='other')
+        recipe.tags.add(linked)
+        create_recipe(self.user).tags.add(other)
+
+        recipe.tags.remove(linked, other)
+
+        self.assertCounts(Tag, {'linked': 0, 'other': 1})
+
+    def test_counts_follow_clear(self):
+        recipe = create_recipe(self.user)
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='a'),
+            Tag.objects.create(user=self.user, name='b'),
+        )
+
+        recipe.tags.clear()
+
+        self.assertCounts(Tag, {'a': 0, 'b': 0})
+
+    def test_counts_follow_reverse_changes(self):
+        tag = Tag.objects.create(user=self.user, name='tag')
+        recipes = [create_recipe(self.user) for _ in range(3)]
+
+        tag.recipe_set.add(*recipes)
+        self.assertCounts(Tag, {'tag': 3})
+
+        tag.recipe_set.remove(recipes[0], recipes[0])
+        self.assertCounts(Tag, {'tag': 2})
+
+        tag.recipe_set.clear()
+        self.assertCounts(Tag, {'tag': 0})
+
+    def test_counts_follow_bulk_import(self):
+        self.client.post(BULK_URL, [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': 10,
+                'price': '1.00',
+                'tags': [{'name': 'dinner'}, {'name': f'tag {i}'}],
+            }
+            for i in range(3)
+        ], format='json')
+
+        self.assertCounts(Tag, {
+            'dinner': 3, 'tag 0': 1, 'tag 1': 1, 'tag 2': 1,
+        })
+
+    def test_sort_popular(self):
+        tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('a', 'b', 'c')
+        }
+        for count, name in ((1, 'a'), (3, 'b'), (1, 'c')):
+            for _ in range(count):
+                create_recipe(self.user).tags.add(tags[name])
+
+        res = self.client.get(TAG_URL, {'sort': 'popular'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['b', 'c', 'a'],
+        )
+
+    def test_sort_invalid(self):
+        res = self.client.get(TAG_URL, {'sort': 'random'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recount_command(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='tag')
+        unused = Ingrediant.objects.create(user=self.user, name='unused')
+        recipe.tags.add(tag)
+        Tag.objects.update(recipe_count=7)
+        Ingrediant.objects.update(recipe_count=2)
+
+        call_command(
+            'recount_recipe_usage',
+            '--batch-size', '1',
+            stdout=StringIO(),
+        )
+
+        tag.refresh_from_db()
+        unused.refresh_from_db()
+        self.assertEqual((tag.recipe_count, unused.recipe_count), (1, 0))
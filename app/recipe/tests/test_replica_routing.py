@@ -0,0 +1,99 @@
+"""
+Docstring for app.recipe.tests.test_replica_routing
+"""
+
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+REPLICAS = settings.DATABASE_REPLICATION['REPLICAS']
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@skipUnless(REPLICAS, 'needs DB_REPLICA_HOSTS, see the CI workflow')
+@override_settings(
+    RECIPE_CACHE_TIMEOUT=0,
+    DATABASE_REPLICATION={
+        **settings.DATABASE_REPLICATION, 'REPLICAS': REPLICAS[:1],
+    },
+)
+class ReplicaRoutingTests(TestCase):
+    """The replica is a second connection to the test database.
+
+    It runs outside the test case transaction, so rows created by a test
+    are only visible when the read went to the primary.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'userpass',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_reads_from_replica(self):
+        create_recipe(self.user)
+
+        with CaptureQueriesContext(connections[REPLICAS[0]]) as ctx:
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+        self.assertTrue(ctx.captured_queries)
+
+    def test_tag_list_reads_from_replica(self):
+        Tag.objects.create(user=self.user, name='tag')
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_read_your_writes(self):
+        res = self.client.post(RECIPE_URL, {
+            'title': 'soup',
+            'time_minutes': 10,
+            'price': '2.00',
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connections[REPLICAS[0]]) as ctx:
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['results']],
+            ['soup'],
+        )
+        self.assertFalse(ctx.captured_queries)
+
+    def test_failed_write_does_not_pin(self):
+        create_recipe(self.user)
+        self.client.post(RECIPE_URL, {'title': 'no price'}, format='json')
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
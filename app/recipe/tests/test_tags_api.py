@@ -7,10 +7,12 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 from core.models import Tag, Recipe
+from recipe.autocomplete import has_trigram
 from recipe.serializers import TagSerializer
 from decimal import Decimal
 
 TAG_URL = reverse('recipe:tag-list')
+AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
 
 def detail_url(tag_id):
     return reverse('recipe:tag-detail', args=[tag_id])
@@ -44,7 +46,7 @@ class PrivateTagApiTest(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_limited_to_user(self):
         user2 = create_user(email='user2@example.com')
@@ -53,9 +55,9 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(TAG_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         tag = Tag.objects.create(user=self.user, name='test tag')
@@ -67,6 +69,16 @@ class PrivateTagApiTest(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        Tag.objects.create(user=self.user, name='breakfast')
+        tag = Tag.objects.create(user=self.user, name='lunch')
+        url = detail_url(tag.id)
+        res = self.client.patch(url, {'name': 'breakfast'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'lunch')
+
     def test_delete_tag(self):
         tag = Tag.objects.create(user=self.user, name='test')
         url = detail_url(tag.id)
@@ -91,8 +103,8 @@ class PrivateTagApiTest(TestCase):
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
 
     def test_filter_tag_unique(self):
@@ -114,4 +126,60 @@ class PrivateTagApiTest(TestCase):
         recipe2.tags.add(tag)
 
         res = self.client.get(TAG_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_cursor_pagination(self):
+        for name in ['a', 'b', 'c']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAG_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t['name'] for t in res.data['results']],
+            ['c', 'b'],
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual([t['name'] for t in res.data['results']], ['a'])
+
+
+class TagAutocompleteApiTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ('Chicken', 'Chickpea', 'Chili', 'Dessert'):
+            Tag.objects.create(user=self.user, name=name)
+
+    def _names(self, **params):
+        res = self.client.get(AUTOCOMPLETE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [tag['name'] for tag in res.data]
+
+    def test_autocomplete_prefix(self):
+        names = self._names(q='chick')
+
+        self.assertEqual(set(names), {'Chicken', 'Chickpea'})
+
+    def test_autocomplete_limited_to_user(self):
+        other = create_user(email='other@example.com')
+        Tag.objects.create(user=other, name='Chickenwings')
+
+        self.assertNotIn('Chickenwings', self._names(q='chick'))
+
+    def test_autocomplete_limit(self):
+        self.assertEqual(len(self._names(q='chi', limit=2)), 2)
+
+    def test_autocomplete_empty_query(self):
+        self.assertEqual(self._names(q=' '), [])
+
+    def test_autocomplete_invalid_limit(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'chi', 'limit': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_fuzzy(self):
+        if not has_trigram():
+            self.skipTest('pg_trgm is not installed')
+
+        self.assertEqual(self._names(q='chiken')[0], 'Chicken')
@@ -0,0 +1,131 @@
+"""
+Upload handler checking recipe images while they stream in
+"""
+
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext_lazy as _
+from PIL import Image
+from rest_framework import exceptions, status
+
+# Pillow format -> extension the stored file gets.
+FORMAT_EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+    'GIF': '.gif',
+}
+
+# Room for the multipart boundaries and headers around the file.
+MULTIPART_OVERHEAD = 64 * 2 ** 10
+
+
+class ImageTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Image exceeds the maximum upload size.')
+    default_code = 'too_large'
+
+
+def _invalid(message, code):
+    return exceptions.ValidationError({'image': [message]}, code=code)
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Validate an image upload while it streams in.
+
+    The request is rejected as soon as it exceeds `MAX_BYTES`, or once the
+    buffered header shows a format or size we don't accept, so bad uploads
+    are never fully read or decoded. The finished file carries `sha256`,
+    `image_format` and `image_size` attributes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limits = settings.IMAGE_UPLOAD
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        max_length = self.limits['MAX_BYTES'] + MULTIPART_OVERHEAD
+        if content_length and content_length > max_length:
+            # Refuse before a single byte of the body is read.
+            raise ImageTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.hasher = hashlib.sha256()
+        self.header = bytearray()
+        self.image_format = None
+        self.image_size = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limits['MAX_BYTES']:
+            self._reject(ImageTooLarge())
+        self.hasher.update(raw_data)
+        if self.image_format is None:
+            self.header += raw_data
+            self._sniff(final=len(self.header) >= self.limits['SNIFF_BYTES'])
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.image_format is None:
+            self._sniff(final=True)
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        file.image_format = self.image_format
+        file.image_size = self.image_size
+        return file
+
+    def _sniff(self, final):
+        """Read format and dimensions from the buffered header.
+
+        Until `final`, a header Pillow can't parse yet just waits for the
+        next chunk, JPEG metadata can push the frame size back a bit.
+        """
+        try:
+            with Image.open(io.BytesIO(self.header)) as image:
+                image_format, image_size = image.format, image.size
+        except (
+            OSError,
+            SyntaxError,
+            ValueError,
+            Image.DecompressionBombError,
+        ):
+            if final:
+                self._reject(_invalid(
+                    _('Upload a valid image.'),
+                    'invalid_image',
+                ))
+            return
+
+        if image_format not in self.limits['FORMATS']:
+            self._reject(_invalid(
+                _('Unsupported image format %(format)s.') % {
+                    'format': image_format,
+                },
+                'invalid_format',
+            ))
+        width, height = image_size
+        if (
+            max(width, height) > self.limits['MAX_DIMENSION']
+            or width * height > self.limits['MAX_PIXELS']
+        ):
+            self._reject(_invalid(
+                _('Image dimensions %(width)sx%(height)s are too large.') % {
+                    'width': width,
+                    'height': height,
+                },
+                'too_large',
+            ))
+        self.image_format = image_format
+        self.image_size = image_size
+        self.header = bytearray()
+
+    def _reject(self, exc):
+        # The parser doesn't clean up after exceptions other than StopUpload.
+        self.file.close()
+        raise exc
@@ -10,11 +10,28 @@ from django.urls import (
 from rest_framework.routers import DefaultRouter
 
 from recipe import views
+from recipe import async_views
 router = DefaultRouter()
 router.register('recipes', views.RecipeViewSet)
 router.register('tags', views.TagViewSet)
 router.register('ingrediants', views.IngrediantViewSet)
 app_name = 'recipe'
 urlpatterns = [
+    path(
+        'async/recipes/',
+        async_views.recipe_list,
+        name='async-recipe-list',
+    ),
+    path(
+        'async/recipes/<int:pk>/',
+        async_views.recipe_detail,
+        name='async-recipe-detail',
+    ),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path(
+        'async/ingrediants/',
+        async_views.ingrediant_list,
+        name='async-ingrediant-list',
+    ),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,53 @@
+"""
+Recipe counts kept on tags and ingrediants
+"""
+
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Recipe, Tag, Ingrediant
+
+# Model -> name of the Recipe many to many field pointing at it.
+RELATED_FIELDS = {Tag: 'tags', Ingrediant: 'ingrediants'}
+
+
+def through_of(model):
+    """The through model and the name of its column for `model`."""
+    field = Recipe._meta.get_field(RELATED_FIELDS[model])
+    return field.remote_field.through, field.m2m_reverse_name()
+
+
+def adjust_recipe_counts(model, deltas):
+    """Apply `{pk: delta}` to recipe_count, one UPDATE per distinct delta."""
+    if not isinstance(deltas, Counter):
+        deltas = Counter(deltas)
+    by_amount = defaultdict(list)
+    for pk, amount in deltas.items():
+        if amount:
+            by_amount[amount].append(pk)
+    for amount, pks in by_amount.items():
+        model.objects.filter(pk__in=pks).update(
+            recipe_count=Greatest(F('recipe_count') + amount, Value(0)),
+        )
+
+
+def recipe_count_subquery(model, through=None, column=None):
+    """Correlated COUNT of the through rows of each `model` row."""
+    if through is None:
+        through, column = through_of(model)
+    counts = through.objects.filter(
+        **{column: OuterRef('pk')}
+    ).order_by().values(column).annotate(total=Count('*')).values('total')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()),
+        Value(0),
+    )
+
+
+def recount(model, pks):
+    """Set recipe_count from the through table for the given rows."""
+    model.objects.filter(pk__in=pks).update(
+        recipe_count=recipe_count_subquery(model),
+    )
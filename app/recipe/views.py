@@ -1,64 +1,346 @@
-from drf_spectacular.utils import (
-    extend_schema_view,
-    extend_schema,
-    OpenApiParameter,
-    OpenApiTypes,
-)
+from collections.abc import Iterator
+
 from rest_framework import (
+    exceptions,
     viewsets,
     mixins,
     status,
 )
+from django.core.exceptions import ValidationError
+from django.db.models import (
+    Count,
+    Max,
+    Prefetch,
+    prefetch_related_objects,
+)
+from django.http import StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 
+from core import routers
+from core.authentication import CachedTokenAuthentication
 from core.models import Recipe, Tag, Ingrediant
 from recipe import serializers
+from recipe import pagination
+from recipe import bulk
+from recipe import cache
+from recipe import conditional
+from recipe import images
+from recipe import search
+from recipe import filters
+from recipe import autocomplete as completion
+from recipe.parsers import NDJSONParser
+from recipe.renderers import NDJSONRenderer, CSVRenderer
+from recipe.uploadhandlers import ImageUploadHandler
 
-@extend_schema_view(
-    list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description = 'Comma sepearted list of tag ids to filter',
-            ),
-            OpenApiParameter(
-                'ingrediants',
-                OpenApiTypes.STR,
-                description = 'Comma sepearted list of ingrediants ids to filter',
-            ),
-        ]
-    )
-)
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class PaginationMixin:
+    """Cursor pagination by default, page numbers when `page` is given.
+
+    Also when any of `page_number_query_params` is, for orderings a cursor
+    can't follow.
+    """
+    page_number_pagination_class = pagination.RecipePageNumberPagination
+    page_number_query_params = ()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            query_params = (
+                self.page_number_pagination_class.page_query_param,
+            ) + tuple(self.page_number_query_params)
+            if any(param in self.request.query_params
+                   for param in query_params):
+                pagination_class = self.page_number_pagination_class
+            self._paginator = pagination_class()
+        return self._paginator
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica.
+
+    Unless the user wrote within the pin window, then the primary is
+    read so they see their own writes. Successful writes start it.
+    """
+    reads_from_replica = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS
+                and not routers.is_pinned(request.user.id)):
+            self._replica_token = routers.enable_replica_reads()
+            self.reads_from_replica = True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            routers.disable_replica_reads(token)
+            self._replica_token = None
+        if (request.method not in SAFE_METHODS
+                and request.user.is_authenticated
+                and response.status_code < 400):
+            routers.pin_to_primary(request.user.id)
+        return super().finalize_response(
+            request, response, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match / If-Modified-Since without serializing.
+
+    Validators come from one aggregate query over `updated_at`.
+    """
+
+    def _get_validators(self, request, lookup=None):
+        queryset = self.get_queryset().order_by()
+        if lookup is not None:
+            try:
+                queryset = queryset.filter(**{self.lookup_field: lookup})
+            except (TypeError, ValueError, ValidationError):
+                return None, None
+        stats = queryset.aggregate(
+            last_modified=Max('updated_at'),
+            count=Count('id'),
+        )
+        if lookup is not None and not stats['count']:
+            return None, None
+        return conditional.make_validators(
+            f'{self.basename}:{self.action}:{lookup}',
+            stats,
+            cache.get_generation(request.user.id),
+            request.query_params,
+        )
+
+    def _not_modified_response(self, headers):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        etag, last_modified = self._get_validators(request, lookup)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        last_modified = int(last_modified.timestamp())
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+        }
+        if conditional.is_not_modified(request, etag, last_modified):
+            return self._not_modified_response(headers)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ResponseCacheMixin:
+    """Serve list and retrieve from the per-user response cache.
+
+    Cached entries keep their ETag, so conditional requests that hit the
+    cache are answered without touching the database.
+    """
+    cached_headers = ('ETag', 'Last-Modified')
+
+    def _invalidate_cache(self):
+        cache.bump_generation(self.request.user.id)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        if not cache.is_enabled():
+            return handler(request, *args, **kwargs)
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        key = cache.response_key(
+            request.user.id,
+            f'{self.basename}:{self.action}:{lookup}',
+            request.query_params,
+        )
+        cached = cache.get_response(key)
+        if cached is not None:
+            data, headers = cached
+            etag = headers.get('ETag')
+            if etag and conditional.is_not_modified(
+                request,
+                etag,
+                parse_http_date_safe(headers['Last-Modified']),
+            ):
+                return self._not_modified_response(headers)
+            response = Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set_response(key, response.data, {
+                name: response[name]
+                for name in self.cached_headers if response.has_header(name)
+            })
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class RecipeViewSet(ReplicaReadMixin,
+                    ResponseCacheMixin,
+                    ConditionalListMixin,
+                    ConditionalRetrieveMixin,
+                    PaginationMixin,
+                    viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    queryset = Recipe.objects.defer('search_vector')
+    pagination_class = pagination.RecipeCursorPagination
+    # Ranked results have no stable cursor position.
+    page_number_query_params = ('search',)
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    # Prefetches keep reads flat however many recipes a page has, see
+    # core.querybudget. The count of a page number page is one more.
+    max_queries = {'list': 5, 'retrieve': 5}
+    constant_queries = True
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+    def initialize_request(self, request, *args, **kwargs):
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action == 'upload_image':
+            request.upload_handlers = [ImageUploadHandler(request)]
+        return drf_request
 
-    def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingrediants = self.request.query_params.get('ingrediants')
+    def _is_search(self):
+        return bool(self.request.query_params.get('search', '').strip())
+
+    def _get_query(self):
+        """Validated query parameters, a 400 for invalid ones."""
+        if not hasattr(self, '_query'):
+            list_serializer = (
+                serializers.RecipeSearchSerializer if self._is_search()
+                else serializers.RecipeSerializer
+            )
+            serializer = serializers.RecipeQuerySerializer(
+                data=self.request.query_params,
+                context={'allowed_fields': list_serializer.Meta.fields},
+            )
+            serializer.is_valid(raise_exception=True)
+            self._query = serializer.validated_data
+        return self._query
+
+    def get_ordering(self):
+        """Also read by the cursor pagination."""
+        return filters.ordering_fields(
+            self._get_query().get('ordering', filters.DEFAULT_ORDERING)
+        )
+
+    def _prefetch_lookups(self):
+        """Load nested tags and ingrediants in one query per relation."""
+        return [
+            Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+            Prefetch(
+                'ingrediants',
+                queryset=Ingrediant.objects.only('id', 'name'),
+            ),
+        ]
+
+    def _filter_queryset(self):
+        query = self._get_query()
         queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingrediants:
-            ingrediant_ids = self._params_to_ints(ingrediants)
-            queryset = queryset.filter(ingrediants__id__in=ingrediant_ids)
+        if query.get('tags'):
+            queryset = filters.filter_related(
+                queryset, Tag, query['tags'], query['match'],
+            )
+        if query.get('ingrediants'):
+            queryset = filters.filter_related(
+                queryset, Ingrediant, query['ingrediants'], query['match'],
+            )
+        ranges = {
+            'time_minutes__gte': query.get('time_minutes_min'),
+            'time_minutes__lte': query.get('time_minutes_max'),
+            'price__gte': query.get('price_min'),
+            'price__lte': query.get('price_max'),
+        }
+        queryset = queryset.filter(**{
+            lookup: value
+            for lookup, value in ranges.items() if value is not None
+        })
+        if query.get('search'):
+            queryset = search.search(queryset, query['search'])
 
         return queryset.filter(
             user = self.request.user
-        ).order_by('-id').distinct()
-    
+        ).order_by(*self.get_ordering())
+
+    def _sparse_queryset(self, queryset, fields):
+        """Load only the columns and relations `fields` needs."""
+        serializer = self.get_serializer_class()()
+        concrete = {field.name for field in Recipe._meta.concrete_fields}
+        # Cursors read the ordering columns of the last row.
+        columns = {name.lstrip('-') for name in self.get_ordering()}
+        for name in fields:
+            source = serializer.fields[name].source
+            # Method fields read the column of their own name.
+            if source == '*':
+                source = name
+            if source in concrete:
+                columns.add(source)
+        lookups = [
+            lookup for lookup in self._prefetch_lookups()
+            if lookup.prefetch_to in fields
+        ]
+        return queryset.only(*columns).prefetch_related(*lookups)
+
+    def get_queryset(self):
+        queryset = self._filter_queryset()
+        if self.action in ('destroy', 'upload_image'):
+            return queryset
+        fields = self._get_query().get('fields')
+        if self.action == 'list' and fields:
+            return self._sparse_queryset(queryset, fields)
+
+        return queryset.prefetch_related(*self._prefetch_lookups())
+
+    def filter_queryset(self, queryset):
+        # Ranking stays out of get_queryset, the aggregate behind the
+        # ETag would compute a headline for every match otherwise.
+        queryset = super().filter_queryset(queryset)
+        text = self._get_query().get('search')
+        if text and self.action == 'list':
+            queryset = search.rank(queryset, text)
+            if 'ordering' in self._get_query():
+                queryset = queryset.order_by(*self.get_ordering())
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            fields = self._get_query().get('fields')
+            kwargs.setdefault('fields', fields or None)
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.action == 'list':
+            if self._is_search():
+                return serializers.RecipeSearchSerializer
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
@@ -66,6 +348,84 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.serializer_class
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        self._invalidate_cache()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self._invalidate_cache()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        self._invalidate_cache()
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """Import a JSON array or NDJSON stream of recipes."""
+        items = request.data
+        # A JSON array, or the lines NDJSONParser yields.
+        if not isinstance(items, (list, Iterator)):
+            return Response(
+                {'detail': 'Expected a list of recipes.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            results = bulk.import_recipes(
+                request.user,
+                items,
+                self.get_serializer_context(),
+            )
+        finally:
+            self._invalidate_cache()
+        created = sum(
+            1 for result in results if result['status'] == 'created'
+        )
+        return Response(
+            {
+                'created': created,
+                'failed': len(results) - created,
+                'results': results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def _iter_export_rows(self):
+        """Read through a server-side cursor, prefetching per chunk.
+
+        Runs while the response streams, after the view returned.
+        """
+        if self.reads_from_replica:
+            with routers.replica_reads():
+                yield from self._export_rows()
+        else:
+            yield from self._export_rows()
+
+    def _export_rows(self):
+        rows = self._filter_queryset().iterator(chunk_size=bulk.CHUNK_SIZE)
+        for chunk in bulk.iter_chunks(rows, bulk.CHUNK_SIZE):
+            prefetch_related_objects(chunk, *self._prefetch_lookups())
+            for recipe in chunk:
+                yield serializers.RecipeDetailSerializer(recipe).data
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV (`?format=csv`)."""
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.render_rows(self._iter_export_rows()),
+            content_type=renderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -73,39 +433,77 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            self._invalidate_cache()
+            images.enqueue(recipe.id)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@extend_schema_view(
-    list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'assigned_only',
-                OpenApiTypes.INT, enum=[0, 1],
-                description='Filter by items assigned to recipes',
-            )
-        ]
-    )
-)
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            ConditionalListMixin,
+                            PaginationMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin, 
                             mixins.ListModelMixin, 
                             viewsets.GenericViewSet):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
-    
+    pagination_class = pagination.RecipeAttrCursorPagination
+    max_queries = {'list': 3, 'autocomplete': 2}
+    constant_queries = True
+
+    # Ordering per `sort` value, anything but the default uses page numbers.
+    orderings = {
+        'name': ('-name',),
+        'popular': ('-recipe_count', '-name', '-id'),
+    }
+    page_number_query_params = ('sort',)
+
     def get_queryset(self):
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
+        sort = self.request.query_params.get('sort', 'name')
+        if sort not in self.orderings:
+            raise exceptions.ValidationError({
+                'sort': [f'Must be one of {", ".join(self.orderings)}.'],
+            })
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*self.orderings[sort])
+
+    def perform_update(self, serializer):
+        serializer.save()
+        cache.bump_generation(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        cache.bump_generation(self.request.user.id)
+
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """Best matching names of the user for type-ahead."""
+        text = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get(
+                'limit',
+                completion.DEFAULT_LIMIT,
+            ))
+        except ValueError:
+            return Response(
+                {'limit': ['A valid integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not text:
+            return Response([])
+        limit = max(1, min(limit, completion.MAX_LIMIT))
+        queryset = self.queryset.filter(user=request.user).only('id', 'name')
+        matches = completion.complete(queryset, text, limit)
+        return Response(self.get_serializer(matches, many=True).data)
     
 
 class TagViewSet(BaseRecipeAttrViewSet):
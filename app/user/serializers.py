@@ -9,8 +9,13 @@ from django.contrib.auth import (
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from core.instrumentation import InstrumentedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(
+    InstrumentedSerializerMixin,
+    serializers.ModelSerializer,
+):
     class Meta:
         model = get_user_model()
         fields = ['email', 'password', 'name']
@@ -29,7 +34,10 @@ class UserSerializer(serializers.ModelSerializer):
         return user
         
 
-class AuthTokenSerializer(serializers.Serializer):
+class AuthTokenSerializer(
+    InstrumentedSerializerMixin,
+    serializers.Serializer,
+):
     email = serializers.EmailField()
     password = serializers.CharField(
         style={'input_type': 'password'},
@@ -2,13 +2,23 @@
 Docstring for app.user.tests.test_user_api
 """
 
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.throttling import LoginIPThrottle, LoginEmailThrottle
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -16,8 +26,12 @@ ME_URL = reverse('user:me')
 def create_user(**params):
     return get_user_model().objects.create_user(**params)
 
+def make_pbkdf2_password(password):
+    return make_password(password, hasher='pbkdf2_sha256')
+
 class PublicUserAPITests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -88,6 +102,103 @@ class PublicUserAPITests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_token_reuses_cached_token(self):
+        create_user(email='test@example.com', password='testpass')
+        payload = {'email': 'test@example.com', 'password': 'testpass'}
+        first = self.client.post(TOKEN_URL, payload)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(second.data['token'], first.data['token'])
+        self.assertFalse(any(
+            'authtoken_token' in query['sql']
+            for query in ctx.captured_queries
+        ))
+
+    @patch.object(
+        LoginEmailThrottle,
+        'THROTTLE_RATES',
+        {'login_email': '2/min'},
+    )
+    @patch('user.serializers.authenticate')
+    def test_create_token_throttled_by_email(self, patched_authenticate):
+        patched_authenticate.return_value = None
+        payload = {'email': 'Test@example.com', 'password': 'badpass'}
+        for i in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload['email'] = ' test@example.com'
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(patched_authenticate.call_count, 2)
+
+    @patch.object(LoginIPThrottle, 'THROTTLE_RATES', {'login_ip': '2/min'})
+    def test_create_token_throttled_by_ip(self):
+        for i in range(2):
+            payload = {'email': f'user{i}@example.com', 'password': 'bad'}
+            self.client.post(TOKEN_URL, payload)
+
+        payload = {'email': 'other@example.com', 'password': 'bad'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch.object(LoginIPThrottle, 'THROTTLE_RATES', {'login_ip': '5/min'})
+    def test_concurrent_attempts_share_the_bucket(self):
+        """A slow cache read leaves every attempt time to race."""
+        # Patched on the class, the threads get their own cache objects.
+        backend = type(caches['default'])
+        get = backend.get
+
+        def slow_get(*args, **kwargs):
+            value = get(*args, **kwargs)
+            time.sleep(0.02)
+            return value
+
+        request = RequestFactory().post(TOKEN_URL)
+
+        def attempt(_):
+            return LoginIPThrottle().allow_request(request, None)
+
+        with patch.object(backend, 'get', slow_get):
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                allowed = list(executor.map(attempt, range(20)))
+
+        self.assertEqual(allowed.count(True), 5)
+
+    def test_create_token_json_list(self):
+        res = self.client.post(TOKEN_URL, [{'email': 'a@b.c'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(
+        PASSWORD_HASHERS=[
+            'core.hashers.TunedBCryptSHA256PasswordHasher',
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        ],
+        PASSWORD_HASHING={'BCRYPT_ROUNDS': 4},
+    )
+    def test_create_token_rehashes_password(self):
+        user = create_user(email='test@example.com', password='testpass')
+        user.password = make_pbkdf2_password('testpass')
+        user.save()
+        payload = {'email': 'test@example.com', 'password': 'testpass'}
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('bcrypt_sha256$$2b$04$'))
+
+        with self.settings(PASSWORD_HASHING={'BCRYPT_ROUNDS': 5}):
+            self.client.post(TOKEN_URL, payload)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('bcrypt_sha256$$2b$05$'))
+
     def test_retrieve_user_unautherized(self):
         res = self.client.get(ME_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,85 @@
+"""
+Token bucket throttles for the login endpoint
+"""
+
+import hashlib
+import time
+from collections.abc import Mapping
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Token bucket throttle, `rate` gives the burst size and refill speed.
+
+    Buckets live in the default cache, which has to be shared between
+    the workers for `rate` to hold across them, see core.checks. A
+    bucket is read and written back under a lock taken with `cache.add`,
+    so concurrent requests can't spend the same token. A request that
+    can't get the lock within `lock_wait` seconds is throttled.
+    """
+    lock_timeout = 5
+    lock_wait = 1
+    lock_poll = 0.005
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        lock_key = f'{self.key}:lock'
+        if not self.acquire(lock_key):
+            self.wait_seconds = self.lock_wait
+            return False
+        try:
+            return self.take_token()
+        finally:
+            self.cache.delete(lock_key)
+
+    def acquire(self, lock_key):
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(lock_key, 1, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.lock_poll)
+        return True
+
+    def take_token(self):
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        refill = (now - updated) * self.num_requests / self.duration
+        tokens = min(self.num_requests, tokens + refill)
+        if tokens < 1:
+            missing = 1 - tokens
+            self.wait_seconds = missing * self.duration / self.num_requests
+            return False
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginEmailThrottle(TokenBucketThrottle):
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email:
+            return None
+        ident = hashlib.sha1(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -1,8 +1,14 @@
 from django.shortcuts import render
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from core.authentication import (
+    CachedTokenAuthentication,
+    get_or_create_token_key,
+)
+from user.throttling import LoginIPThrottle, LoginEmailThrottle
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer
@@ -15,10 +21,19 @@ class CreateUserView(generics.CreateAPIView):
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     render_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # Throttles run before the serializer, so rejected attempts never
+    # reach the password hasher.
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response({'token': get_or_create_token_key(user)})
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_class = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
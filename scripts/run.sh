@@ -0,0 +1,16 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+# Deploy checks fail on settings that break with several workers, such
+# as the response cache without a shared cache.
+python manage.py check --deploy --fail-level ERROR
+python manage.py collectstatic --noinput
+python manage.py migrate
+python manage.py generate_schema
+# Image jobs only live in the workers, pick up those a previous run lost.
+python manage.py process_pending_images
+
+# Settings in app/gunicorn.conf.py, overridable from the environment.
+exec gunicorn --config gunicorn.conf.py